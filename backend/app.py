@@ -1,4 +1,5 @@
-from flask import Flask, request, jsonify
+import hmac
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
@@ -12,12 +13,39 @@ jwt = JWTManager()
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    proxies = app.config.get("TRUSTED_PROXY_COUNT", 1)
+    if proxies:
+        # x_for gives the per-IP login limiter the client address, not the proxy's
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
     CORS(app, resources={r"/*": {"origins": app.config.get("CORS_ORIGINS", [])}})
     
+    from .utils.db_profiles import engine_options, install_pragmas
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        **engine_options(app.config), **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    }
     db.init_app(app)
+    with app.app_context():
+        install_pragmas(db.engine, app.config)
+        if app.config.get("METRICS_ENABLED", True):
+            from .utils.metrics import init_metrics
+            init_metrics(app, db.engine)
+        from .utils.query_profiler import init_query_profiling
+        init_query_profiling(app, db.engine)
     jwt.init_app(app)
 
+    from .qr.cache import qr_cache
+    qr_cache.configure(app.config["QR_CACHE_SIZE"], app.config["QR_CACHE_TTL_SECONDS"])
+    from .utils.records import gate_records
+    gate_records.configure(
+        app.config["RECORD_CACHE_SIZE"], app.config["RECORD_CACHE_TTL_SECONDS"], app.config.get("RECORD_CACHE_URL")
+    )
+    from .utils.nonce import init_nonce_store
+    init_nonce_store(app)
+    from .utils.tokens import init_token_codecs
+    init_token_codecs(app)
+    from .utils.authz import operator_directory
+    operator_directory.configure(app.config["OPERATOR_CACHE_SIZE"], app.config["OPERATOR_CACHE_TTL_SECONDS"])
+
     @app.before_request
     def enforce_https():
         if not app.config.get("ENFORCE_HTTPS", False):
@@ -36,6 +64,9 @@ def create_app():
     from .routes.gate import bp as gate_bp
     from .routes.admin import bp as admin_bp
     
+    from .routes.auth import init_login_limits
+    init_login_limits(app)
+    
     app.register_blueprint(auth_bp)
     app.register_blueprint(gate_bp)
     app.register_blueprint(admin_bp)
@@ -45,10 +76,39 @@ def create_app():
     @app.route("/healthz")
     def healthz():
         return jsonify({"status": "healthy"}), 200
+    @app.route("/metrics")
+    def metrics_endpoint():
+        if not app.config.get("METRICS_ENABLED", True):
+            return jsonify({"error": "Metrics disabled"}), 404
+        token = app.config.get("METRICS_TOKEN")
+        if not token:
+            return jsonify({"error": "Metrics require METRICS_TOKEN to be set"}), 404
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return jsonify({"error": "Unauthorized"}), 401
+        from .utils.metrics import metrics
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
     
     # Create tables
     with app.app_context():
         db.create_all()
+        from .utils.indexes import missing_indexes
+        missing = missing_indexes()
+        if missing:
+            app.logger.warning(
+                "Missing indexes %s; run `flask ensure-indexes`", ", ".join(index.name for index in missing)
+            )
+        from .utils.stats import rollup_needs_backfill
+        if rollup_needs_backfill():
+            app.logger.warning("Exit rollup is empty; run `flask rebuild-exit-rollup`")
+        from .models.asset_summary import asset_summary_needs_backfill
+        if asset_summary_needs_backfill():
+            app.logger.warning("Asset summary is empty; run `flask reconcile-asset-summary`")
+
+    from .cli import register_commands
+    register_commands(app)
+
+    from .utils.audit import init_audit
+    init_audit(app)
     
     return app
 
@@ -0,0 +1,155 @@
+"""Measure exit-log commit throughput and concurrent read latency per DB profile.
+
+Run with ``python -m backend.benchmarks.db_profiles``. Without ``--url`` each
+profile gets a fresh SQLite file in a temporary directory. ``--url`` must
+point at an empty database (a SQLite file is also left in WAL mode by the
+``sqlite`` profile); the tables are created there and dropped again after
+each profile unless ``--keep`` is given. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, func, insert, inspect, select
+from sqlalchemy.exc import OperationalError
+from backend.config import Config
+from backend.models.student import Student
+from backend.models.operator import Operator
+from backend.models.asset import Asset
+from backend.models.exit_log import ExitLog
+from backend.utils.db_profiles import engine_options, install_pragmas
+
+BENCH_STUDENT = "BENCH-STU"
+BENCH_OPERATOR = "bench-operator"
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+def _settings(url, profile):
+    settings = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    settings.update(SQLALCHEMY_DATABASE_URI=url, DB_PROFILE=profile)
+    return settings
+
+BENCH_TABLES = [Student.__table__, Operator.__table__, Asset.__table__, ExitLog.__table__]
+
+def _prepare(engine):
+    Student.metadata.create_all(engine, tables=BENCH_TABLES)
+    with engine.begin() as connection:
+        if connection.execute(select(Student.student_id).where(Student.student_id == BENCH_STUDENT)).first() is None:
+            connection.execute(insert(Student).values(student_id=BENCH_STUDENT, full_name="Benchmark", status="active"))
+        operator_id = connection.execute(select(Operator.user_id).where(Operator.username == BENCH_OPERATOR)).scalar()
+        if operator_id is None:
+            operator_id = connection.execute(
+                insert(Operator).values(username=BENCH_OPERATOR, password_hash="-", role="gate_operator")
+            ).inserted_primary_key[0]
+    return operator_id
+
+def _existing_tables(url):
+    engine = create_engine(url)
+    try:
+        return inspect(engine).get_table_names()
+    finally:
+        engine.dispose()
+
+def run_profile(url, profile, writers, readers, seconds, drop_tables=False):
+    settings = _settings(url, profile)
+    engine = create_engine(url, **engine_options(settings))
+    install_pragmas(engine, settings)
+    operator_id = _prepare(engine)
+    write_samples, read_samples, errors = [], [], []
+    deadline = time.monotonic() + seconds
+    lock = threading.Lock()
+
+    def writer():
+        samples, failures = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.begin() as connection:
+                    connection.execute(insert(ExitLog).values(
+                        timestamp=datetime.utcnow(), student_id=BENCH_STUDENT,
+                        operator_id=operator_id, result="ALLOWED", reason="benchmark"
+                    ))
+            except OperationalError:
+                failures += 1
+                continue
+            samples.append(time.perf_counter() - started)
+        with lock:
+            write_samples.extend(samples)
+            errors.append(failures)
+
+    def reader():
+        samples = []
+        statement = select(func.count()).select_from(ExitLog).where(ExitLog.result == "ALLOWED")
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(statement).scalar()
+            except OperationalError:
+                continue
+            samples.append(time.perf_counter() - started)
+        with lock:
+            read_samples.extend(samples)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if drop_tables:
+        Student.metadata.drop_all(engine, tables=BENCH_TABLES)
+    engine.dispose()
+    return {
+        "profile": profile,
+        "commits_per_second": round(len(write_samples) / seconds, 1),
+        "write_p50_ms": _percentile(write_samples, 0.5),
+        "write_p95_ms": _percentile(write_samples, 0.95),
+        "reads_per_second": round(len(read_samples) / seconds, 1),
+        "read_p50_ms": _percentile(read_samples, 0.5),
+        "read_p95_ms": _percentile(read_samples, 0.95),
+        "write_errors": sum(errors)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None,
+                        help="URL of an empty database to run against; a temporary SQLite file per profile by default.")
+    parser.add_argument("--keep", action="store_true", help="Leave the benchmark tables in the --url database.")
+    parser.add_argument("--profiles", default=None,
+                        help="Comma-separated profiles; default,sqlite or default,postgres by default.")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    if args.url:
+        tables = _existing_tables(args.url)
+        if tables:
+            parser.error(f"--url must point at an empty database; found tables: {', '.join(sorted(tables))}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        is_sqlite = args.url is None or args.url.startswith("sqlite")
+        profiles = (args.profiles or ("default,sqlite" if is_sqlite else "default,postgres")).split(",")
+        for profile in profiles:
+            url = args.url or f"sqlite:///{os.path.join(workdir, profile + '.db')}"
+            drop_tables = bool(args.url) and not args.keep
+            results.append(run_profile(url, profile, args.writers, args.readers, args.seconds, drop_tables=drop_tables))
+    print(json.dumps({
+        "writers": args.writers,
+        "readers": args.readers,
+        "seconds": args.seconds,
+        "results": results
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
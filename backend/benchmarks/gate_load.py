@@ -0,0 +1,249 @@
+"""Seed a stand-in database and drive the gate API with concurrent simulated gates.
+
+Run with ``python -m backend.benchmarks.gate_load``. All gates log in
+concurrently first; the timed phase then loops each gate over scan-student followed by scan-asset (students with assets) or
+exit-without-asset (students without), reading the log page and, on the
+admin gate, the statistics endpoint every few exits. Per-endpoint latency
+percentiles and throughput are printed as JSON; ``--output`` saves them and
+``--compare`` reports the change against an earlier run.
+
+By default the data lives in a temporary SQLite file that is removed
+afterwards. ``--url`` must point at an empty database; the benchmark
+creates its tables there and drops them again at the end unless ``--keep``
+is given.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+BENCH_PASSWORD = "bench-password"
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+def seed(app, students, assets, logs, gates, batch_size=5000):
+    """Bulk-load the stand-in data set; returns the gate accounts and student plan"""
+    # Imported here: backend.config reads the environment benchmark() prepares
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from backend.app import db
+    from backend.models.student import Student
+    from backend.models.asset import Asset
+    from backend.models.operator import Operator
+    from backend.models.asset_summary import reconcile_asset_summary
+    from backend.qr.verify import sign_qr_payload
+    from backend.utils.audit import write_exit_logs
+    from backend.utils.passwords import password_hasher
+
+    rng = random.Random(42)
+    student_ids = [f"BST{index:07d}" for index in range(students)]
+    with app.app_context():
+        password_hash = password_hasher.hash(BENCH_PASSWORD)
+        operators = [{"username": f"bench-gate-{index}", "password_hash": password_hash, "role": "gate_operator"}
+                     for index in range(gates)]
+        operators.append({"username": "bench-admin", "password_hash": password_hash, "role": "admin"})
+        db.session.execute(insert(Operator), operators)
+        for start in range(0, students, batch_size):
+            db.session.execute(insert(Student), [
+                {"student_id": student_id, "full_name": f"Student {student_id}", "status": "active"}
+                for student_id in student_ids[start:start + batch_size]
+            ])
+        db.session.commit()
+
+        secret_key = app.config["QR_SECRET_KEY"].encode()
+        fmt = app.config.get("QR_TOKEN_FORMAT", "pipe")
+        timestamp = int(time.time())
+        qr_by_student = defaultdict(list)
+        for start in range(0, assets, batch_size):
+            rows = []
+            for asset_id in range(start + 1, min(start + batch_size, assets) + 1):
+                owner = student_ids[rng.randrange(students)]
+                qr_data = sign_qr_payload(secret_key, asset_id, owner, f"BSN{asset_id:08d}",
+                                          f"{rng.getrandbits(64):016x}", timestamp, fmt=fmt)
+                rows.append({"asset_id": asset_id, "owner_student_id": owner, "serial_number": f"BSN{asset_id:08d}",
+                             "qr_signature": qr_data, "status": "active"})
+                qr_by_student[owner].append(qr_data)
+            db.session.execute(insert(Asset), rows)
+            db.session.commit()
+        reconcile_asset_summary()
+
+        operator_ids = [row.user_id for row in Operator.query.filter(Operator.username.like("bench-%"))]
+        now = datetime.utcnow()
+        for start in range(0, logs, batch_size):
+            write_exit_logs([
+                {"timestamp": now - timedelta(seconds=rng.randrange(90 * 86400)),
+                 "student_id": student_ids[rng.randrange(students)], "asset_id": None,
+                 "operator_id": rng.choice(operator_ids),
+                 "result": "ALLOWED" if rng.random() < 0.9 else "BLOCKED",
+                 "reason": "Seeded exit"}
+                for _ in range(min(batch_size, logs - start))
+            ])
+            db.session.commit()
+    return [operator["username"] for operator in operators], student_ids, qr_by_student
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def call(self, client, name, method, path, **kwargs):
+        started = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples[name].append(elapsed)
+            self.statuses[name][response.status_code] += 1
+        return response
+
+def _login(app, recorder, username, sessions):
+    response = recorder.call(app.test_client(), "auth/login", "POST", "/auth/login",
+                             json={"username": username, "password": BENCH_PASSWORD})
+    if response.status_code == 200:
+        sessions[username] = {"Authorization": f"Bearer {response.json['access_token']}"}
+
+def _gate(app, recorder, username, headers, student_ids, qr_by_student, deadline, seed_value, admin_every):
+    rng = random.Random(seed_value)
+    client = app.test_client()
+    is_admin = username == "bench-admin"
+    exits = 0
+    while time.monotonic() < deadline:
+        student_id = rng.choice(student_ids)
+        response = recorder.call(client, "gate/scan-student", "POST", "/gate/exit/scan-student",
+                                 json={"student_id": student_id}, headers=headers)
+        if response.status_code == 200:
+            token = response.json["exit_token"]
+            qr_list = qr_by_student.get(student_id)
+            if qr_list:
+                recorder.call(client, "gate/scan-asset", "POST", "/gate/exit/scan-asset",
+                              json={"student_id": student_id, "qr_data": rng.choice(qr_list), "exit_token": token},
+                              headers=headers)
+            else:
+                recorder.call(client, "gate/exit-without-asset", "POST", "/gate/exit/exit-without-asset",
+                              json={"student_id": student_id, "exit_token": token}, headers=headers)
+        exits += 1
+        if exits % admin_every == 0:
+            recorder.call(client, "gate/logs", "GET", "/gate/exit/logs?limit=50", headers=headers)
+            if is_admin:
+                recorder.call(client, "admin/statistics", "GET", "/admin/statistics", headers=headers)
+
+def _run_threads(threads):
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.monotonic() - started
+
+def run(app, seconds, admin_every, accounts, student_ids, qr_by_student):
+    """Log every gate in concurrently, then run the timed exit loop"""
+    recorder = Recorder()
+    sessions = {}
+    elapsed = {"auth/login": _run_threads([
+        threading.Thread(target=_login, args=(app, recorder, username, sessions)) for username in accounts
+    ])}
+    deadline = time.monotonic() + seconds
+    gate_seconds = _run_threads([
+        threading.Thread(target=_gate, args=(app, recorder, username, headers, student_ids, qr_by_student,
+                                             deadline, index, admin_every))
+        for index, (username, headers) in enumerate(sorted(sessions.items()))
+    ])
+    return {
+        name: {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / elapsed.get(name, gate_seconds), 1),
+            "p50_ms": _percentile(samples, 0.50),
+            "p95_ms": _percentile(samples, 0.95),
+            "p99_ms": _percentile(samples, 0.99),
+            "statuses": {str(code): count for code, count in sorted(recorder.statuses[name].items())},
+            "server_errors": sum(count for code, count in recorder.statuses[name].items() if code >= 500)
+        }
+        for name, samples in sorted(recorder.samples.items())
+    }
+
+def compare(current, baseline):
+    """Relative change per endpoint; positive latency deltas are slowdowns"""
+    report = {}
+    for name, figures in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        report[name] = {
+            f"{key}_change": round((figures[key] - before[key]) / before[key], 3) if before[key] else None
+            for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None,
+                        help="URL of an empty database to run against; a temporary SQLite file by default.")
+    parser.add_argument("--keep", action="store_true", help="Leave the seeded tables in the --url database.")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--assets", type=int, default=4000)
+    parser.add_argument("--logs", type=int, default=50000)
+    parser.add_argument("--gates", type=int, default=4, help="Concurrent gate operators; one admin gate is added.")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--admin-every", type=int, default=20, help="Read logs/statistics every N exits.")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file.")
+    parser.add_argument("--compare", default=None, help="Earlier JSON report to compare against.")
+    args = parser.parse_args()
+
+    if args.url:
+        tables = _existing_tables(args.url)
+        if tables:
+            parser.error(f"--url must point at an empty database; found tables: {', '.join(sorted(tables))}")
+        benchmark(args, args.url, drop_tables=not args.keep)
+        return
+    with tempfile.TemporaryDirectory(prefix="gate-load-") as workdir:
+        benchmark(args, f"sqlite:///{os.path.join(workdir, 'gate.db')}", drop_tables=False)
+
+def _existing_tables(url):
+    from sqlalchemy import create_engine, inspect
+    engine = create_engine(url)
+    try:
+        return inspect(engine).get_table_names()
+    finally:
+        engine.dispose()
+
+def benchmark(args, url, drop_tables):
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("ENFORCE_HTTPS", "0")
+    from backend.app import create_app, db
+    app = create_app()
+    try:
+        seed_started = time.monotonic()
+        accounts, student_ids, qr_by_student = seed(app, args.students, args.assets, args.logs, args.gates)
+        report = {
+            "config": {key: getattr(args, key) for key in ("students", "assets", "logs", "gates", "seconds", "admin_every")},
+            "database": app.config["SQLALCHEMY_DATABASE_URI"].split("://")[0],
+            "python": sys.version.split()[0],
+            "seed_seconds": round(time.monotonic() - seed_started, 2),
+            "endpoints": run(app, args.seconds, args.admin_every, accounts, student_ids, qr_by_student)
+        }
+    finally:
+        writer = app.extensions.get("exit_log_writer")
+        if writer is not None:
+            writer.stop()
+        with app.app_context():
+            db.session.remove()
+            if drop_tables:
+                db.drop_all()
+            db.engine.dispose()
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            report["compare"] = compare(report, json.load(handle))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
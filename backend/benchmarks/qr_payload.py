@@ -0,0 +1,87 @@
+"""Compare QR payload formats by size, QR symbol version and verify cost.
+
+Run with ``python -m backend.benchmarks.qr_payload``; results are printed as
+JSON. The QR version column needs the optional ``qrcode`` package.
+"""
+import argparse
+import json
+import secrets
+import statistics
+import time
+from backend.config import Config
+from backend.qr.compact import CompactQRCodec
+from backend.utils.tokens import TokenCodec
+
+try:
+    import qrcode
+except ImportError:
+    qrcode = None
+
+FORMATS = ("pipe", "binary", "compact")
+
+def _payloads(fmt, count, secret_key):
+    codec = TokenCodec(secret_key, field_count=5, max_length=1024)
+    compact = CompactQRCodec(secret_key)
+    payloads = []
+    timestamp = int(time.time())
+    for asset_id in range(1, count + 1):
+        student_id = f"STU{asset_id % 5000:06d}"
+        nonce = secrets.token_hex(8)
+        if fmt == "compact":
+            payloads.append(compact.encode(asset_id, student_id, bytes.fromhex(nonce), timestamp))
+        else:
+            payloads.append(codec.encode([asset_id, student_id, f"SN-{asset_id:08d}", nonce, timestamp], fmt=fmt))
+    return payloads
+
+def _qr_version(payload):
+    if qrcode is None:
+        return None
+    code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M)
+    code.add_data(payload)
+    code.make(fit=True)
+    return code.version
+
+def _time_verify(decode, payloads, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for payload in payloads:
+            if decode(payload) is None:
+                raise SystemExit("benchmark payload failed to verify")
+        samples.append((time.perf_counter() - started) / len(payloads))
+    return statistics.median(samples)
+
+def _time_reject(decode, payloads):
+    started = time.perf_counter()
+    for payload in payloads:
+        decode(payload)
+    return (time.perf_counter() - started) / len(payloads)
+
+def run(count=2000, rounds=5):
+    secret_key = Config.QR_SECRET_KEY.encode()
+    codec = TokenCodec(secret_key, field_count=5, max_length=1024)
+    compact = CompactQRCodec(secret_key)
+    results = {}
+    for fmt in FORMATS:
+        payloads = _payloads(fmt, count, secret_key)
+        decode = compact.decode if fmt == "compact" else codec.decode
+        lengths = [len(payload) for payload in payloads]
+        junk = ["x" * len(payload) for payload in payloads]
+        results[fmt] = {
+            "mean_length": round(statistics.mean(lengths), 1),
+            "max_length": max(lengths),
+            "qr_version": _qr_version(max(payloads, key=len)),
+            "verify_us": round(_time_verify(decode, payloads, rounds) * 1e6, 2),
+            "reject_junk_us": round(statistics.median(_time_reject(decode, junk) for _ in range(rounds)) * 1e6, 2)
+        }
+    return {"payloads": count, "rounds": rounds, "formats": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payloads", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.payloads, args.rounds), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import os
+import click
+
+def register_commands(app):
+    @app.cli.command("rebuild-exit-rollup")
+    def rebuild_exit_rollup():
+        """Recompute the hourly exit rollup from the exit log and its archives"""
+        from backend.jobs.log_retention import archive_path
+        from backend.utils.stats import rebuild_rollup
+        total = rebuild_rollup(archive_dir=archive_path())
+        click.echo(f"Rolled up {total} exit log rows")
+
+    @app.cli.command("reconcile-asset-summary")
+    @click.option("--dry-run", is_flag=True, help="Report drift without repairing it.")
+    def reconcile_asset_summary_command(dry_run):
+        """Check per-student active asset counts against the asset table"""
+        from backend.models.asset_summary import reconcile_asset_summary
+        drift = reconcile_asset_summary(dry_run=dry_run)
+        for student_id, stored, actual in drift:
+            click.echo(f"{student_id}: stored={stored} actual={actual}", err=True)
+        click.echo(f"drifted={len(drift)}" + (" (dry run)" if dry_run else " repaired"))
+
+    @app.cli.command("ensure-indexes")
+    def ensure_indexes_command():
+        """Create any model-declared index missing from the database"""
+        from backend.utils.indexes import ensure_indexes
+        created = ensure_indexes()
+        click.echo(f"created {len(created)} indexes" + (f": {', '.join(created)}" if created else ""))
+
+    @app.cli.command("check-query-plans")
+    def check_query_plans_command():
+        """EXPLAIN the hot gate and dashboard queries; fail on any full table scan"""
+        from backend.utils.indexes import check_query_plans, hot_queries
+        offenders = check_query_plans()
+        for name, _ in hot_queries():
+            click.echo(f"{'FULL SCAN' if name in offenders else 'ok':9} {name}"
+                       + (f" ({'; '.join(offenders[name])})" if name in offenders else ""))
+        if offenders:
+            raise click.ClickException(f"{len(offenders)} hot queries fall back to a full scan")
+
+    @app.cli.command("archive-exit-logs")
+    @click.option("--retain-days", type=int, default=None,
+                  help="Keep this many days in the database; defaults to EXIT_LOG_RETENTION_DAYS.")
+    @click.option("--dry-run", is_flag=True, help="Report what would be archived without moving anything.")
+    def archive_exit_logs_command(retain_days, dry_run):
+        """Move old exit log months into compressed NDJSON archive files"""
+        from backend.jobs.log_retention import archive_exit_logs, archive_path
+        result = archive_exit_logs(
+            archive_path(),
+            retain_days if retain_days is not None else app.config["EXIT_LOG_RETENTION_DAYS"],
+            batch_size=app.config.get("EXIT_LOG_ARCHIVE_BATCH_SIZE", 5000),
+            dry_run=dry_run
+        )
+        for month, count in result["months"].items():
+            click.echo(f"{month}: {count}", err=True)
+        click.echo(f"archived={result['archived']} before={result['cutoff']}" + (" (dry run)" if dry_run else ""))
+
+    @app.cli.command("import-assets")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default=None,
+                  help="Input format; guessed from the file extension by default.")
+    @click.option("--batch-size", type=int, default=None)
+    @click.option("--report", "report_path", type=click.Path(dir_okay=False), default=None,
+                  help="Write the per-row report as NDJSON to this file.")
+    def import_assets_command(path, fmt, batch_size, report_path):
+        """Bulk-register assets from a CSV or NDJSON file"""
+        import json
+        from backend.jobs.asset_import import iter_records, import_assets
+        fmt = fmt or ("ndjson" if path.lower().endswith((".ndjson", ".jsonl")) else "csv")
+        batch_size = batch_size or app.config.get("ASSET_IMPORT_BATCH_SIZE", 500)
+        summary = {"created": 0, "conflict": 0, "error": 0}
+        report = open(report_path, "w", encoding="utf-8") if report_path else None
+        try:
+            with open(path, encoding="utf-8", newline="") as stream:
+                for entry in import_assets(iter_records(stream, fmt), batch_size=batch_size):
+                    summary[entry["status"]] += 1
+                    if report:
+                        report.write(json.dumps(entry) + "\n")
+                    elif entry["status"] != "created":
+                        click.echo(json.dumps(entry), err=True)
+        finally:
+            if report:
+                report.close()
+        click.echo(f"created={summary['created']} conflict={summary['conflict']} error={summary['error']}")
+
+    @app.cli.command("sync-roster")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--dry-run", is_flag=True, help="Report the diff without applying it.")
+    @click.option("--keep-removed", is_flag=True, help="Do not block students missing from the export.")
+    @click.option("--batch-size", type=int, default=None)
+    def sync_roster_command(path, dry_run, keep_removed, batch_size):
+        """Sync the student table with a registrar CSV export"""
+        import json
+        from backend.jobs.roster_sync import sync_roster
+        batch_size = batch_size or app.config.get("ROSTER_SYNC_BATCH_SIZE", 1000)
+        with open(path, encoding="utf-8", newline="") as stream:
+            diff = sync_roster(stream, dry_run=dry_run, block_removed=not keep_removed, batch_size=batch_size)
+        for entry in diff["rejected"]:
+            click.echo(json.dumps(entry), err=True)
+        click.echo(" ".join(
+            f"{key}={len(diff[key])}" for key in ("new", "renamed", "blocked", "unblocked", "removed", "rejected")
+        ) + (" (dry run)" if dry_run else ""))
+
+    @app.cli.command("rotate-qr")
+    @click.option("--chunk-size", type=int, default=500)
+    @click.option("--workers", type=int, default=os.cpu_count() or 1, show_default=True)
+    @click.option("--checkpoint", "checkpoint_path", type=click.Path(dir_okay=False),
+                  default=None, help="Progress file used to resume an interrupted run "
+                                     "(default: qr-rotation.checkpoint.json in the instance folder).")
+    @click.option("--sheets", "sheets_dir", type=click.Path(file_okay=False), default=None,
+                  help="Also render printable sticker sheets into this directory.")
+    @click.option("--sheet-format", type=click.Choice(["png", "pdf"]), default="png")
+    def rotate_qr_command(chunk_size, workers, checkpoint_path, sheets_dir, sheet_format):
+        """Re-issue QR payloads for all active assets"""
+        from backend.jobs.qr_rotation import rotate_qr_signatures
+        if checkpoint_path is None:
+            os.makedirs(app.instance_path, exist_ok=True)
+            checkpoint_path = os.path.join(app.instance_path, "qr-rotation.checkpoint.json")
+        sheet_writer = None
+        if sheets_dir:
+            from backend.qr.sheets import StickerSheetWriter
+            try:
+                sheet_writer = StickerSheetWriter(sheets_dir, fmt=sheet_format)
+            except RuntimeError as exc:
+                raise click.ClickException(str(exc))
+
+        def progress(total, rate):
+            click.echo(f"rotated {total} assets ({rate:.0f} assets/s)", err=True)
+
+        result = rotate_qr_signatures(
+            chunk_size=chunk_size,
+            workers=workers,
+            checkpoint_path=checkpoint_path,
+            sheet_writer=sheet_writer,
+            progress=progress
+        )
+        click.echo(
+            f"rotated={result['rotated']} total={result['rotated_total']} "
+            f"seconds={result['seconds']} assets_per_second={result['assets_per_second']}"
+        )
+
+    @app.cli.command("export-gate-snapshot")
+    @click.argument("path", type=click.Path(dir_okay=False))
+    @click.option("--since", type=int, default=None, help="Export a delta after this change sequence number.")
+    def export_gate_snapshot_command(path, since):
+        """Write a signed offline gate snapshot to a file"""
+        import json
+        from backend.offline.snapshot import build_snapshot, snapshot_key
+        try:
+            secret_key = snapshot_key(app.config)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        snapshot = build_snapshot(secret_key, since=since)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(snapshot, handle, separators=(",", ":"))
+        click.echo(f"seq={snapshot['seq']} students={len(snapshot['students'])} assets={len(snapshot['assets'])}")
@@ -0,0 +1,124 @@
+import csv
+import json
+from itertools import islice
+from sqlalchemy.exc import IntegrityError
+from backend.app import db
+from backend.models.asset import Asset
+from backend.models.student import Student
+from backend.qr.verify import generate_qr_signature
+from backend.utils.records import gate_records
+
+IMPORT_FIELDS = ["owner_student_id", "serial_number", "brand", "color", "visible_specs"]
+
+STREAM_FORMATS = ("csv", "ndjson")
+
+def iter_records(stream, fmt):
+    """Return an iterator of ``(row_number, record)`` read from a text stream one line at a time"""
+    if fmt not in STREAM_FORMATS:
+        raise ValueError("format must be csv or ndjson")
+    return _csv_records(stream) if fmt == "csv" else _ndjson_records(stream)
+
+def _csv_records(stream):
+    for row_number, record in enumerate(csv.DictReader(stream), start=1):
+        yield row_number, record
+
+def _ndjson_records(stream):
+    for row_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield row_number, record if isinstance(record, dict) else None
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _validate(record):
+    if record is None:
+        return None, "Malformed row"
+    values = {field: (str(record[field]).strip() if record.get(field) not in (None, "") else None) for field in IMPORT_FIELDS}
+    for field in ("owner_student_id", "serial_number"):
+        if not values[field]:
+            return None, f"{field} is required"
+    if len(values["serial_number"]) < 3:
+        return None, "serial_number is too short"
+    return values, None
+
+def _import_batch(batch):
+    report = {}
+    valid = {}
+    for row_number, record in batch:
+        values, error = _validate(record)
+        if error:
+            report[row_number] = {"row": row_number, "status": "error", "error": error}
+        else:
+            valid[row_number] = values
+
+    owner_ids = {values["owner_student_id"] for values in valid.values()}
+    serials = {values["serial_number"] for values in valid.values()}
+    active_owners = {
+        student_id for (student_id,) in db.session.execute(
+            db.select(Student.student_id).where(Student.student_id.in_(owner_ids), Student.status == "active")
+        )
+    } if owner_ids else set()
+    existing = {
+        serial: asset_id for serial, asset_id in db.session.execute(
+            db.select(Asset.serial_number, Asset.asset_id).where(Asset.serial_number.in_(serials))
+        )
+    } if serials else {}
+
+    created = {}
+    seen = set()
+    for row_number, values in valid.items():
+        serial = values["serial_number"]
+        if values["owner_student_id"] not in active_owners:
+            report[row_number] = {"row": row_number, "serial_number": serial, "status": "error",
+                                  "error": "Student not found or not active"}
+        elif serial in existing or serial in seen:
+            report[row_number] = {"row": row_number, "serial_number": serial, "status": "conflict",
+                                  "existing_asset_id": existing.get(serial)}
+        else:
+            seen.add(serial)
+            created[row_number] = Asset(status="active", **values)
+
+    if created:
+        try:
+            db.session.add_all(created.values())
+            db.session.flush()
+            for asset in created.values():
+                asset.qr_signature = generate_qr_signature(asset)
+            # Read before the commit expires the assets, which would cost a refresh each
+            results = {
+                row_number: (asset.asset_id, asset.owner_student_id, asset.qr_signature)
+                for row_number, asset in created.items()
+            }
+            db.session.commit()
+            gate_records.invalidate(student_ids={owner for _, owner, _ in results.values()})
+        except IntegrityError:
+            db.session.rollback()
+            for row_number in created:
+                report[row_number] = {"row": row_number, "serial_number": valid[row_number]["serial_number"],
+                                      "status": "error", "error": "Conflicting write, batch rolled back"}
+            results = {}
+
+        for row_number, (asset_id, _, qr_data) in results.items():
+            report[row_number] = {"row": row_number, "serial_number": valid[row_number]["serial_number"],
+                                  "status": "created", "asset_id": asset_id, "qr_data": qr_data}
+    return [report[row_number] for row_number, _ in batch]
+
+def import_assets(records, batch_size=500):
+    """Register assets from ``(row_number, record)`` pairs in batches.
+
+    Each batch costs one owner lookup, one serial-conflict lookup and one
+    transaction that inserts the assets and stores their QR signatures.
+    Yields one report entry per input row, in input order.
+    """
+    for batch in _batches(records, batch_size):
+        yield from _import_batch(batch)
@@ -0,0 +1,123 @@
+import gzip
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select
+from backend.app import db
+from backend.models.exit_log import ExitLog
+
+ARCHIVE_FILE = re.compile(r"^exit_log-(\d{4})-(\d{2})\.ndjson\.gz$")
+
+def archive_path():
+    return current_app.config.get("EXIT_LOG_ARCHIVE_DIR") or os.path.join(current_app.instance_path, "exit_log_archive")
+
+def _month_start(moment):
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+def _archive_row(row):
+    return {
+        "log_id": row.log_id,
+        "timestamp": row.timestamp.isoformat(),
+        "student_id": row.student_id,
+        "asset_id": row.asset_id,
+        "operator_id": row.operator_id,
+        "result": row.result,
+        "reason": row.reason
+    }
+
+def _append(path, rows):
+    """Append rows as one gzip member and make them durable before returning"""
+    data = "".join(json.dumps(row) + "\n" for row in rows).encode()
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+            archive.write(data)
+        raw.flush()
+        os.fsync(raw.fileno())
+
+def archive_exit_logs(archive_dir, retain_days, batch_size=5000, now=None, dry_run=False):
+    """Move exit log rows from months older than the retention window to archives.
+
+    Whole calendar months before ``now - retain_days`` are moved, oldest
+    log ID first, into one gzip NDJSON file per month. Each batch is written
+    and synced before its rows are deleted, so an interrupted run loses
+    nothing; rows it re-archives are skipped on read. The hourly rollup is
+    left alone, so dashboard totals keep counting archived exits, and
+    ``rebuild_rollup`` counts them again from the archive files.
+    """
+    cutoff = _month_start((now or datetime.utcnow()) - timedelta(days=retain_days))
+    if not dry_run:
+        os.makedirs(archive_dir, exist_ok=True)
+    months = defaultdict(int)
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(ExitLog.__table__)
+            .where(ExitLog.timestamp < cutoff, ExitLog.log_id > last_id)
+            .order_by(ExitLog.log_id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].log_id
+        by_month = defaultdict(list)
+        for row in rows:
+            by_month[row.timestamp.strftime("%Y-%m")].append(_archive_row(row))
+        for month, entries in by_month.items():
+            months[month] += len(entries)
+            if not dry_run:
+                _append(os.path.join(archive_dir, f"exit_log-{month}.ndjson.gz"), entries)
+        if not dry_run:
+            db.session.execute(delete(ExitLog).where(ExitLog.log_id.in_([row.log_id for row in rows])))
+            db.session.commit()
+    db.session.rollback()
+    return {
+        "cutoff": cutoff.isoformat(),
+        "archived": sum(months.values()),
+        "months": dict(sorted(months.items())),
+        "dry_run": dry_run
+    }
+
+def _read_month(path):
+    """Rows of one archive file; duplicates left by an interrupted run are dropped"""
+    rows = []
+    max_seen = 0
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            row = json.loads(line)
+            if row["log_id"] <= max_seen:
+                continue
+            max_seen = row["log_id"]
+            rows.append(row)
+    return rows
+
+def iter_archived_logs(archive_dir, since=None, until=None, predicate=None):
+    """Archived rows, newest first like the live log export.
+
+    Months outside ``[since, until)`` are skipped without being opened; one
+    month of matching rows is held in memory at a time.
+    """
+    if not os.path.isdir(archive_dir):
+        return
+    months = []
+    for name in os.listdir(archive_dir):
+        match = ARCHIVE_FILE.match(name)
+        if match:
+            months.append((datetime(int(match.group(1)), int(match.group(2)), 1), name))
+    for month, name in sorted(months, reverse=True):
+        if (until is not None and month >= until) or (since is not None and _next_month(month) <= since):
+            continue
+        rows = []
+        for row in _read_month(os.path.join(archive_dir, name)):
+            timestamp = datetime.fromisoformat(row["timestamp"])
+            if (since is not None and timestamp < since) or (until is not None and timestamp >= until):
+                continue
+            if predicate is None or predicate(row):
+                rows.append(row)
+        rows.sort(key=lambda row: (row["timestamp"], row["log_id"]), reverse=True)
+        yield from rows
@@ -0,0 +1,102 @@
+import json
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from sqlalchemy import select, update
+from backend.app import db
+from backend.models.asset import Asset
+from backend.models.gate_change import record_gate_changes
+from backend.qr.cache import qr_cache
+from backend.utils.records import gate_records
+from backend.qr.verify import sign_qr_payload
+
+def _sign_row(args):
+    secret_key, fmt, asset_id, owner_student_id, serial_number, timestamp = args
+    return asset_id, sign_qr_payload(
+        secret_key, asset_id, owner_student_id, serial_number, secrets.token_hex(8), timestamp, fmt=fmt
+    )
+
+def _load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    return {"last_asset_id": 0, "rotated": 0}
+
+def _save_checkpoint(path, checkpoint):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(checkpoint, handle)
+    os.replace(tmp_path, path)
+
+def rotate_qr_signatures(chunk_size=500, workers=1, checkpoint_path=None, statuses=("active",),
+                         sheet_writer=None, progress=None):
+    """Re-issue QR payloads for every asset, one keyset chunk at a time.
+
+    Chunks are signed on a process pool when ``workers`` > 1 and written
+    back with a single bulk UPDATE per chunk. After each commit the last
+    asset ID is saved to ``checkpoint_path``, so an interrupted run picks
+    up where it stopped; the checkpoint is removed once the run completes.
+    Returns throughput figures for the run.
+    """
+    checkpoint = _load_checkpoint(checkpoint_path)
+    secret_key = current_app.config["QR_SECRET_KEY"].encode()
+    fmt = current_app.config.get("QR_TOKEN_FORMAT", "pipe")
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    started = time.monotonic()
+    rotated = 0
+    try:
+        while True:
+            rows = db.session.execute(
+                select(Asset.asset_id, Asset.owner_student_id, Asset.serial_number)
+                .where(Asset.asset_id > checkpoint["last_asset_id"], Asset.status.in_(statuses))
+                .order_by(Asset.asset_id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            timestamp = int(time.time())
+            jobs = [(secret_key, fmt, asset_id, owner, serial, timestamp) for asset_id, owner, serial in rows]
+            if executor is not None:
+                signed = list(executor.map(_sign_row, jobs, chunksize=max(1, len(jobs) // workers)))
+            else:
+                signed = [_sign_row(job) for job in jobs]
+
+            db.session.execute(
+                update(Asset),
+                [{"asset_id": asset_id, "qr_signature": qr_data} for asset_id, qr_data in signed]
+            )
+            record_gate_changes(db.session.connection(), "asset", [asset_id for asset_id, _ in signed])
+            db.session.commit()
+            for asset_id, _ in signed:
+                qr_cache.invalidate_asset(asset_id)
+            gate_records.invalidate(asset_ids=[asset_id for asset_id, _ in signed])
+
+            rotated += len(signed)
+            checkpoint = {"last_asset_id": rows[-1].asset_id, "rotated": checkpoint["rotated"] + len(signed)}
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+            if sheet_writer is not None:
+                serials = {asset_id: serial for asset_id, _, serial in rows}
+                for asset_id, qr_data in signed:
+                    sheet_writer.add(serials[asset_id], qr_data)
+            if progress is not None:
+                progress(checkpoint["rotated"], rotated / max(time.monotonic() - started, 1e-9))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if sheet_writer is not None:
+            sheet_writer.close()
+
+    elapsed = time.monotonic() - started
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return {
+        "rotated": rotated,
+        "rotated_total": checkpoint["rotated"],
+        "seconds": round(elapsed, 3),
+        "assets_per_second": round(rotated / elapsed, 1) if elapsed > 0 else None
+    }
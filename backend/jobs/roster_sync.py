@@ -0,0 +1,148 @@
+import csv
+from itertools import islice
+from sqlalchemy import Table, Column, MetaData, String, select, insert, update, exists, and_, or_, func
+from sqlalchemy.exc import IntegrityError
+from backend.app import db
+from backend.models.student import Student
+from backend.models.gate_change import record_gate_changes
+from backend.utils.records import gate_records
+
+STUDENT_STATUSES = ("active", "blocked")
+
+def _stage_table():
+    return Table(
+        "roster_stage",
+        MetaData(),
+        Column("student_id", String(20), primary_key=True),
+        Column("full_name", String(100), nullable=False),
+        Column("status", String(20), nullable=True),
+        prefixes=["TEMPORARY"]
+    )
+
+def _clean(record):
+    student_id = (record.get("student_id") or "").strip()
+    full_name = (record.get("full_name") or "").strip()
+    status = (record.get("status") or "").strip().lower() or None
+    if len(student_id) < 3 or len(student_id) > 20:
+        return None, "Invalid student_id"
+    if not full_name:
+        return None, "full_name is required"
+    if status is not None and status not in STUDENT_STATUSES:
+        return None, f"Unknown status: {status}"
+    return {"student_id": student_id, "full_name": full_name[:100], "status": status}, None
+
+def _load_stage(connection, stage, stream, batch_size):
+    rejected = []
+    reader = enumerate(csv.DictReader(stream), start=1)
+    while True:
+        batch = list(islice(reader, batch_size))
+        if not batch:
+            return rejected
+        rows = {}
+        for row_number, record in batch:
+            row, error = _clean(record)
+            if error is None and row["student_id"] in rows:
+                error = "Duplicate student_id in roster"
+            if error:
+                rejected.append({"row": row_number, "error": error})
+            else:
+                rows[row["student_id"]] = row
+        if not rows:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(stage), list(rows.values()))
+        except IntegrityError:
+            # A duplicate from an earlier batch; fall back to row-by-row for this batch
+            for row in rows.values():
+                try:
+                    with connection.begin_nested():
+                        connection.execute(insert(stage), [row])
+                except IntegrityError:
+                    rejected.append({"student_id": row["student_id"], "error": "Duplicate student_id in roster"})
+
+def sync_roster(stream, dry_run=False, block_removed=True, batch_size=1000):
+    """Diff a registrar CSV export against the student table and apply it.
+
+    The export (``student_id``, ``full_name`` and optional ``status``
+    columns) is streamed into a temporary staging table; the diff and the
+    upserts are then computed by the database, so memory grows with the
+    size of the diff rather than the roster. A row without a status keeps
+    the student's current one (new students start active). Students missing
+    from the export are blocked unless ``block_removed`` is False.
+    """
+    connection = db.session.connection()
+    stage = _stage_table()
+    stage.create(connection, checkfirst=True)
+    try:
+        rejected = _load_stage(connection, stage, stream, batch_size)
+
+        new_ids = [
+            student_id for (student_id,) in connection.execute(
+                select(stage.c.student_id)
+                .where(~exists().where(Student.student_id == stage.c.student_id))
+            )
+        ]
+        renamed, blocked, unblocked = [], [], []
+        # A blank or missing status keeps the one on file; only an explicit value is applied
+        status_changed = and_(stage.c.status.is_not(None), stage.c.status != Student.status)
+        changed = connection.execute(
+            select(stage.c.student_id, stage.c.full_name, stage.c.status, Student.full_name, Student.status)
+            .join(Student, Student.student_id == stage.c.student_id)
+            .where(or_(stage.c.full_name != Student.full_name, status_changed))
+        )
+        for student_id, full_name, status, old_name, old_status in changed:
+            if full_name != old_name:
+                renamed.append(student_id)
+            if status is not None and status != old_status:
+                (blocked if status == "blocked" else unblocked).append(student_id)
+        removed_filter = and_(
+            ~exists().where(stage.c.student_id == Student.student_id),
+            Student.status != "blocked"
+        )
+        removed = [
+            student_id for (student_id,) in connection.execute(select(Student.student_id).where(removed_filter))
+        ] if block_removed else []
+
+        if not dry_run:
+            connection.execute(
+                insert(Student).from_select(
+                    ["student_id", "full_name", "status"],
+                    select(stage.c.student_id, stage.c.full_name, func.coalesce(stage.c.status, "active"))
+                    .where(~exists().where(Student.student_id == stage.c.student_id))
+                )
+            )
+            staged = select(stage.c.full_name).where(stage.c.student_id == Student.student_id).scalar_subquery()
+            staged_status = select(stage.c.status).where(stage.c.student_id == Student.student_id).scalar_subquery()
+            connection.execute(
+                update(Student)
+                .where(exists().where(and_(
+                    stage.c.student_id == Student.student_id,
+                    or_(stage.c.full_name != Student.full_name, status_changed)
+                )))
+                .values(full_name=staged, status=func.coalesce(staged_status, Student.status))
+                .execution_options(synchronize_session=False)
+            )
+            if block_removed:
+                connection.execute(
+                    update(Student).where(removed_filter).values(status="blocked")
+                    .execution_options(synchronize_session=False)
+                )
+            record_gate_changes(connection, "student", set(new_ids + renamed + blocked + unblocked + removed))
+    finally:
+        stage.drop(connection, checkfirst=True)
+
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+        gate_records.invalidate(student_ids=set(renamed + blocked + unblocked + removed))
+    return {
+        "dry_run": dry_run,
+        "new": new_ids,
+        "renamed": renamed,
+        "blocked": blocked,
+        "unblocked": unblocked,
+        "removed": removed,
+        "rejected": rejected
+    }
@@ -4,6 +4,10 @@ from datetime import datetime
 
 class Asset(db.Model):
     __tablename__ = 'asset'
+    __table_args__ = (
+        db.Index('idx_asset_owner_status', 'owner_student_id', 'status'),
+        db.Index('idx_asset_status', 'status'),
+    )
     
     asset_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     owner_student_id = db.Column(db.String(20), db.ForeignKey('student.student_id'), nullable=False)
@@ -0,0 +1,127 @@
+from backend.app import db
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import bindparam, event, func, insert, inspect, literal, select, update
+from sqlalchemy.orm import Session, backref, relationship
+from backend.models.student import Student
+from backend.models.asset import Asset
+
+class StudentAssetSummary(db.Model):
+    """Denormalized count of each student's active assets for the gate.
+
+    Maintained by the flush hook below, so a gate check is one
+    primary-key lookup; a student without a row has no active assets.
+    """
+    __tablename__ = 'student_asset_summary'
+    
+    student_id = db.Column(db.String(20), db.ForeignKey('student.student_id'), primary_key=True)
+    active_assets = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    student = relationship(
+        Student,
+        backref=backref('asset_summary', uselist=False, lazy='joined', viewonly=True),
+        viewonly=True
+    )
+
+def active_asset_count(student):
+    summary = student.asset_summary
+    return summary.active_assets if summary else 0
+
+def apply_active_deltas(connection, deltas):
+    """Apply per-student count changes on the given connection's transaction.
+
+    Students without a summary row get one counted from the asset table,
+    which already reflects the changes being flushed.
+    """
+    deltas = {student_id: delta for student_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = StudentAssetSummary.__table__
+    now = datetime.utcnow()
+    present = set(connection.execute(
+        select(table.c.student_id).where(table.c.student_id.in_(list(deltas)))
+    ).scalars())
+    if present:
+        connection.execute(
+            update(table)
+            .where(table.c.student_id == bindparam("b_student_id"))
+            .values(active_assets=table.c.active_assets + bindparam("b_delta"), updated_at=now),
+            [{"b_student_id": student_id, "b_delta": deltas[student_id]} for student_id in present]
+        )
+    missing = [student_id for student_id in deltas if student_id not in present]
+    if missing:
+        connection.execute(
+            insert(table).from_select(
+                ["student_id", "active_assets", "updated_at"],
+                select(Asset.owner_student_id, func.count(), literal(now))
+                .where(Asset.owner_student_id.in_(missing), Asset.status == 'active')
+                .group_by(Asset.owner_student_id)
+            )
+        )
+
+def _previous(obj, name):
+    history = inspect(obj).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, name)
+
+def _count_asset_changes(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Asset) and obj.status == 'active':
+            deltas[obj.owner_student_id] += 1
+    for obj in session.dirty:
+        if not isinstance(obj, Asset):
+            continue
+        old_owner, old_status = _previous(obj, 'owner_student_id'), _previous(obj, 'status')
+        if old_status == 'active':
+            deltas[old_owner] -= 1
+        if obj.status == 'active':
+            deltas[obj.owner_student_id] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Asset) and _previous(obj, 'status') == 'active':
+            deltas[_previous(obj, 'owner_student_id')] -= 1
+    apply_active_deltas(session.connection(), deltas)
+
+# Session-level so a bulk import costs two statements per flush, not two per asset
+event.listen(Session, "after_flush", _count_asset_changes)
+
+def reconcile_asset_summary(dry_run=False):
+    """Compare every summary row with the asset table and repair drift.
+
+    Returns ``(student_id, stored, actual)`` for each mismatch found.
+    """
+    actual = dict(db.session.execute(
+        select(Asset.owner_student_id, func.count())
+        .where(Asset.status == 'active')
+        .group_by(Asset.owner_student_id)
+    ).all())
+    stored = dict(db.session.execute(
+        select(StudentAssetSummary.student_id, StudentAssetSummary.active_assets)
+    ).all())
+    drift = [
+        (student_id, stored.get(student_id), actual.get(student_id, 0))
+        for student_id in sorted(set(actual) | set(stored))
+        if stored.get(student_id, 0) != actual.get(student_id, 0)
+    ]
+    if drift and not dry_run:
+        now = datetime.utcnow()
+        table = StudentAssetSummary.__table__
+        db.session.execute(table.delete().where(table.c.student_id.in_([row[0] for row in drift])))
+        db.session.execute(insert(table), [
+            {"student_id": student_id, "active_assets": count, "updated_at": now}
+            for student_id, _, count in drift
+        ])
+        db.session.commit()
+    return drift
+
+def asset_summary_needs_backfill():
+    """True for databases that predate the summary: active assets but no summary rows.
+
+    Backfill with the ``reconcile-asset-summary`` command rather than at
+    startup, where concurrent workers would race on the reinsert.
+    """
+    if db.session.query(StudentAssetSummary.student_id).first() is not None:
+        return False
+    return db.session.query(Asset.asset_id).filter(Asset.status == 'active').first() is not None
@@ -3,6 +3,13 @@ from datetime import datetime
 
 class ExitLog(db.Model):
     __tablename__ = 'exit_log'
+    __table_args__ = (
+        db.Index('idx_exit_log_timestamp_id', 'timestamp', 'log_id'),
+        db.Index('idx_exit_log_student_timestamp', 'student_id', 'timestamp'),
+        db.Index('idx_exit_log_operator_timestamp', 'operator_id', 'timestamp'),
+        db.Index('idx_exit_log_result_timestamp', 'result', 'timestamp'),
+        db.Index('idx_exit_log_asset', 'asset_id'),
+    )
     
     log_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,23 @@
+from backend.app import db
+
+class ExitRollup(db.Model):
+    """Hourly exit counts per operator (gate), result and reason"""
+    __tablename__ = 'exit_rollup'
+    __table_args__ = (
+        db.Index('idx_exit_rollup_operator_bucket', 'operator_id', 'bucket_start'),
+    )
+    
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    operator_id = db.Column(db.Integer, primary_key=True)
+    result = db.Column(db.String(20), primary_key=True)
+    reason = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'bucket_start': self.bucket_start.isoformat(),
+            'operator_id': self.operator_id,
+            'result': self.result,
+            'reason': self.reason,
+            'count': self.count
+        }
@@ -0,0 +1,50 @@
+from backend.app import db
+from datetime import datetime
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from backend.models.student import Student
+from backend.models.asset import Asset
+
+class GateChange(db.Model):
+    """Append-only feed of student/asset changes for delta gate snapshots"""
+    __tablename__ = 'gate_change'
+    
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(10), nullable=False)  # student, asset
+    key = db.Column(db.String(20), nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def record_gate_changes(connection, kind, keys):
+    """Append change records on the given connection's transaction"""
+    now = datetime.utcnow()
+    rows = [{"kind": kind, "key": str(key), "changed_at": now} for key in keys]
+    if rows:
+        connection.execute(insert(GateChange), rows)
+
+def _changed_keys(session):
+    keys = {"student": set(), "asset": set()}
+    for obj in session.new | session.deleted:
+        if isinstance(obj, Student):
+            keys["student"].add(obj.student_id)
+        elif isinstance(obj, Asset):
+            keys["asset"].add(obj.asset_id)
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Student):
+            keys["student"].add(obj.student_id)
+        elif isinstance(obj, Asset):
+            keys["asset"].add(obj.asset_id)
+    return keys
+
+def _record_flushed_changes(session, flush_context):
+    now = datetime.utcnow()
+    rows = [
+        {"kind": kind, "key": str(key), "changed_at": now}
+        for kind, keys in _changed_keys(session).items() for key in sorted(keys, key=str)
+    ]
+    if rows:
+        session.connection().execute(insert(GateChange), rows)
+
+# Session-level so a bulk import appends its changes in one executemany per flush
+event.listen(Session, "after_flush", _record_flushed_changes)
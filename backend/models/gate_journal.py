@@ -0,0 +1,17 @@
+from backend.app import db
+from datetime import datetime
+
+class GateJournalCursor(db.Model):
+    """Highest journal sequence number synced from each offline gate node"""
+    __tablename__ = 'gate_journal_cursor'
+    
+    node_id = db.Column(db.String(64), primary_key=True)
+    last_seq = db.Column(db.Integer, nullable=False, default=0)
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'node_id': self.node_id,
+            'last_seq': self.last_seq,
+            'synced_at': self.synced_at.isoformat() if self.synced_at else None
+        }
@@ -2,8 +2,12 @@ from app import db
 
 # Import all models
 from .student import Student
-from .operator import Operator
+from .operator import Operator, DisabledOperator
 from .asset import Asset
+from .asset_summary import StudentAssetSummary
 from .exit_log import ExitLog
+from .exit_rollup import ExitRollup
+from .gate_change import GateChange
+from .gate_journal import GateJournalCursor
 
-__all__ = ['db', 'Student', 'Operator', 'Asset', 'ExitLog']
\ No newline at end of file
+__all__ = ['db', 'Student', 'Operator', 'DisabledOperator', 'Asset', 'StudentAssetSummary', 'ExitLog', 'ExitRollup', 'GateChange', 'GateJournalCursor']
\ No newline at end of file
@@ -1,5 +1,5 @@
 from backend.app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime
 
 class Operator(db.Model):
     __tablename__ = 'operator'
@@ -11,16 +11,29 @@ class Operator(db.Model):
     
     # Relationships
     exit_logs = db.relationship('ExitLog', backref='operator', lazy=True)
+    disabled_record = db.relationship(
+        'DisabledOperator', foreign_keys='DisabledOperator.user_id', uselist=False, lazy=True, cascade='all, delete-orphan'
+    )
     
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password, method="pbkdf2:sha256", salt_length=16)
-    
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+    @property
+    def is_active(self):
+        return self.disabled_record is None
     
     def to_dict(self):
         return {
             'user_id': self.user_id,
             'username': self.username,
-            'role': self.role
+            'role': self.role,
+            'active': self.is_active
         }
+
+class DisabledOperator(db.Model):
+    """Marks an operator as disabled without touching their role.
+
+    Kept in its own table so re-enabling restores the operator exactly.
+    """
+    __tablename__ = 'disabled_operator'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('operator.user_id'), primary_key=True)
+    disabled_at = db.Column(db.DateTime, default=datetime.utcnow)
+    disabled_by = db.Column(db.Integer, db.ForeignKey('operator.user_id'), nullable=True)
@@ -3,6 +3,9 @@ from sqlalchemy.orm import relationship
 
 class Student(db.Model):
     __tablename__ = 'student'
+    __table_args__ = (
+        db.Index('idx_student_status', 'status'),
+    )
     
     student_id = db.Column(db.String(20), primary_key=True)
     full_name = db.Column(db.String(100), nullable=False)
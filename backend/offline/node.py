@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from backend.offline.snapshot import SNAPSHOT_VERSION, verify_snapshot, qr_hash
+
+class SnapshotError(Exception):
+    pass
+
+class GateSnapshot:
+    """In-memory copy of a signed gate snapshot for offline decisions.
+
+    Only needs the snapshot key, not the QR or database credentials: a
+    scanned payload is matched by its hash against the registered asset, and
+    its expiry is checked against the issue time recorded in the snapshot.
+    """
+
+    def __init__(self, secret_key):
+        self.secret_key = secret_key
+        self.seq = None
+        self.qr_validity_seconds = 24 * 3600
+        self.students = {}
+        self.assets_by_hash = {}
+        self._assets = {}
+
+    def load(self, snapshot):
+        if not verify_snapshot(snapshot, self.secret_key):
+            raise SnapshotError("Snapshot signature mismatch")
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise SnapshotError("Unsupported snapshot version")
+        if snapshot.get("full"):
+            self.students = {}
+            self.assets_by_hash = {}
+            self._assets = {}
+        elif self.seq is None or snapshot.get("since") != self.seq:
+            raise SnapshotError("Delta does not follow the loaded snapshot")
+        for student_id, status in snapshot["students"]:
+            if status == "active":
+                self.students[student_id] = status
+            else:
+                self.students.pop(student_id, None)
+        for asset_id, serial_number, owner_student_id, status, digest, issued_at in snapshot["assets"]:
+            previous = self._assets.pop(asset_id, None)
+            if previous and previous[3]:
+                self.assets_by_hash.pop(previous[3], None)
+            if status == "active" and digest:
+                entry = (asset_id, serial_number, owner_student_id, digest, issued_at)
+                self._assets[asset_id] = entry
+                self.assets_by_hash[digest] = entry
+        self.seq = snapshot["seq"]
+        self.qr_validity_seconds = snapshot["qr_validity_seconds"]
+
+    def load_file(self, path):
+        with open(path, encoding="utf-8") as handle:
+            self.load(json.load(handle))
+
+    def decide(self, student_id, qr_data=(), now=None):
+        """Same decisions as /gate/exit/verify, as ``(asset_id, result, reason)``"""
+        now = time.time() if now is None else now
+        if student_id not in self.students:
+            return [(None, "BLOCKED", "Student invalid or inactive")]
+        if not qr_data:
+            if any(entry[2] == student_id for entry in self._assets.values()):
+                return [(None, "BLOCKED", "Registered assets present")]
+            return [(None, "ALLOWED", "Exit without registered assets")]
+        decisions = []
+        for payload in qr_data:
+            entry = self.assets_by_hash.get(qr_hash(payload))
+            if entry is None or entry[4] is None or now - entry[4] > self.qr_validity_seconds:
+                decisions.append((None, "BLOCKED", "Invalid QR"))
+            elif entry[2] != student_id:
+                decisions.append((entry[0], "BLOCKED", "Ownership mismatch"))
+            else:
+                decisions.append((entry[0], "ALLOWED", "Exit verified successfully"))
+        return decisions
+
+class GateJournal:
+    """Append-only NDJSON journal of offline decisions awaiting sync"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.seq = 0
+        if os.path.exists(path):
+            for entry in self.entries():
+                self.seq = max(self.seq, entry["seq"])
+
+    def append(self, student_id, result, reason, asset_id=None):
+        with self._lock:
+            self.seq += 1
+            entry = {
+                "seq": self.seq,
+                "timestamp": datetime.utcnow().isoformat(),
+                "student_id": student_id,
+                "asset_id": asset_id,
+                "result": result,
+                "reason": reason
+            }
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(entry) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+            return entry
+
+    def entries(self, after_seq=0):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["seq"] > after_seq:
+                    yield entry
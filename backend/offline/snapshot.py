@@ -0,0 +1,126 @@
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, func
+from backend.app import db
+from backend.models.student import Student
+from backend.models.asset import Asset
+from backend.models.gate_change import GateChange
+from backend.qr.verify import qr_issued_at, qr_validity_seconds
+
+SNAPSHOT_VERSION = 2
+
+def qr_hash(qr_data):
+    """Short digest that lets a gate match a scanned payload without the QR key"""
+    return hashlib.sha256(qr_data.encode()).hexdigest()[:32]
+
+def snapshot_key(config):
+    """The snapshot signing key, refusing one that is unset or shared with the QR key.
+
+    Gate nodes hold this key, so it must never be able to sign stickers.
+    """
+    key = config.get("GATE_SNAPSHOT_SECRET_KEY") or ""
+    if not key:
+        raise ValueError("GATE_SNAPSHOT_SECRET_KEY is not set")
+    if key == config.get("QR_SECRET_KEY"):
+        raise ValueError("GATE_SNAPSHOT_SECRET_KEY must differ from QR_SECRET_KEY")
+    return key.encode()
+
+def canonical_body(snapshot):
+    body = {key: value for key, value in snapshot.items() if key != "signature"}
+    return json.dumps(body, sort_keys=True, separators=(",", ":")).encode()
+
+def sign_snapshot(snapshot, secret_key):
+    snapshot["signature"] = hmac.new(secret_key, canonical_body(snapshot), hashlib.sha256).hexdigest()
+    return snapshot
+
+def verify_snapshot(snapshot, secret_key):
+    signature = snapshot.get("signature")
+    if not isinstance(signature, str):
+        return False
+    expected = hmac.new(secret_key, canonical_body(snapshot), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
+def _asset_entry(asset_id, serial_number, owner_student_id, status, qr_signature):
+    if not qr_signature:
+        return [asset_id, serial_number, owner_student_id, status, None, None]
+    return [asset_id, serial_number, owner_student_id, status, qr_hash(qr_signature), qr_issued_at(qr_signature)]
+
+def settled_seq():
+    """Highest change sequence number a snapshot can safely report.
+
+    Sequence numbers are allocated at insert but become visible at commit,
+    so a lower seq can still appear after a higher one has committed. Changes
+    recorded within ``GATE_SNAPSHOT_SETTLE_SECONDS`` are held back, along with
+    everything after the first of them, until they have had time to commit.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get("GATE_SNAPSHOT_SETTLE_SECONDS", 30))
+    first_recent, latest = db.session.execute(
+        select(func.min(GateChange.seq).filter(GateChange.changed_at > cutoff), func.max(GateChange.seq))
+    ).one()
+    if first_recent is not None:
+        return first_recent - 1
+    return latest or 0
+
+def build_snapshot(secret_key, since=None):
+    """Signed snapshot of gate-relevant state.
+
+    A full snapshot (``since`` is None) lists active students and active
+    assets only; anything absent is treated as blocked by the gate. A delta
+    lists the current state of every record changed after sequence number
+    ``since``, including inactive ones, with deleted records reported as
+    ``"deleted"``. Apply deltas in ``seq`` order. Asset entries carry the
+    issue time of their QR payload so nodes can enforce QR expiry offline.
+    ``seq`` is the settled watermark, so recent changes are reported again
+    by the next delta.
+    """
+    seq = settled_seq()
+    if since is None:
+        students = db.session.execute(
+            select(Student.student_id, Student.status).where(Student.status == "active")
+        ).all()
+        assets = db.session.execute(
+            select(Asset.asset_id, Asset.serial_number, Asset.owner_student_id, Asset.status, Asset.qr_signature)
+            .where(Asset.status == "active")
+        ).all()
+        student_entries = [[student_id, status] for student_id, status in students]
+        asset_entries = [_asset_entry(*row) for row in assets]
+    else:
+        changed = db.session.execute(
+            select(GateChange.kind, GateChange.key)
+            .where(GateChange.seq > since, GateChange.seq <= seq)
+            .distinct()
+        ).all()
+        student_ids = {key for kind, key in changed if kind == "student"}
+        asset_ids = {int(key) for kind, key in changed if kind == "asset"}
+        current_students = dict(db.session.execute(
+            select(Student.student_id, Student.status).where(Student.student_id.in_(student_ids))
+        ).all()) if student_ids else {}
+        current_assets = {
+            row.asset_id: row for row in db.session.execute(
+                select(Asset.asset_id, Asset.serial_number, Asset.owner_student_id, Asset.status, Asset.qr_signature)
+                .where(Asset.asset_id.in_(asset_ids))
+            )
+        } if asset_ids else {}
+        student_entries = [
+            [student_id, current_students.get(student_id, "deleted")] for student_id in sorted(student_ids)
+        ]
+        asset_entries = [
+            _asset_entry(*current_assets[asset_id]) if asset_id in current_assets
+            else [asset_id, None, None, "deleted", None, None]
+            for asset_id in sorted(asset_ids)
+        ]
+
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "generated_at": datetime.utcnow().isoformat(),
+        "full": since is None,
+        "since": since,
+        "seq": seq,
+        "qr_validity_seconds": qr_validity_seconds(),
+        "students": student_entries,
+        "assets": asset_entries
+    }
+    return sign_snapshot(snapshot, secret_key)
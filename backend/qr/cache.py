@@ -0,0 +1,48 @@
+import threading
+from backend.utils.cache import TTLCache
+
+class VerifiedQRCache:
+    """Verified QR payloads keyed by the signed payload itself.
+
+    Each entry holds the authenticated claims and the issue time, so a
+    repeat scan skips the base64/HMAC work; the asset row itself is read
+    through the gate record cache. Entries can be dropped per asset, which
+    QR rotation does for every asset it re-issues.
+    """
+
+    def __init__(self, maxsize=4096, ttl=300):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._by_asset = {}
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize, ttl):
+        self._entries.maxsize = maxsize
+        self._entries.ttl = ttl
+        self.clear()
+
+    def get(self, qr_data):
+        return self._entries.get(qr_data)
+
+    def put(self, qr_data, claims, issued_at, ttl):
+        asset_id = claims[0]
+        with self._lock:
+            keys = {key for key in self._by_asset.get(asset_id, ()) if key in self._entries}
+            keys.add(qr_data)
+            self._by_asset[asset_id] = keys
+        self._entries.set(qr_data, (claims, issued_at), ttl=ttl)
+
+    def invalidate_asset(self, asset_id):
+        with self._lock:
+            keys = self._by_asset.pop(asset_id, set())
+        for key in keys:
+            self._entries.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._by_asset.clear()
+        self._entries.clear()
+
+    def stats(self):
+        return self._entries.stats()
+
+qr_cache = VerifiedQRCache()
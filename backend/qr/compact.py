@@ -0,0 +1,94 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import re
+
+# Version 1 of the compact sticker payload. Only QR alphanumeric-mode
+# characters are used (upper-case base32 plus the prefix), so stickers encode
+# at 5.5 bits per character instead of 8.
+COMPACT_PREFIX = "Q1."
+COMPACT_VERSION = 0x81
+COMPACT_TAG_BYTES = 10
+COMPACT_NONCE_BYTES = 4
+COMPACT_MAX_LENGTH = 128
+
+_COMPACT_TOKEN = re.compile(r"^Q1\.[A-Z2-7]+$")
+
+def _put_varint(value, out):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+def _get_varint(data, offset):
+    value = 0
+    shift = 0
+    while offset < len(data) and shift < 64:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+    raise ValueError("truncated varint")
+
+class CompactQRCodec:
+    """Signs and parses version-1 compact QR payloads.
+
+    Layout before base32: version byte, varint asset ID, varint issue time,
+    4-byte nonce, length-prefixed student ID, then the first 10 bytes of the
+    HMAC-SHA256 over everything before it. The serial number is not carried;
+    the asset ID is authenticated and the serial is read from the asset row.
+    """
+
+    def __init__(self, secret_key):
+        self._mac = hmac.new(secret_key, digestmod=hashlib.sha256)
+
+    def _tag(self, body):
+        mac = self._mac.copy()
+        mac.update(body)
+        return mac.digest()[:COMPACT_TAG_BYTES]
+
+    def encode(self, asset_id, student_id, nonce, timestamp):
+        body = bytearray([COMPACT_VERSION])
+        _put_varint(int(asset_id), body)
+        _put_varint(int(timestamp), body)
+        body += nonce[:COMPACT_NONCE_BYTES].ljust(COMPACT_NONCE_BYTES, b"\0")
+        student = str(student_id).encode()
+        body.append(len(student))
+        body += student
+        body += self._tag(bytes(body))
+        return COMPACT_PREFIX + base64.b32encode(bytes(body)).decode().rstrip("=")
+
+    def decode(self, token):
+        """``(asset_id, student_id, timestamp)`` or None if malformed or forged"""
+        if not isinstance(token, str) or len(token) > COMPACT_MAX_LENGTH or not _COMPACT_TOKEN.match(token):
+            return None
+        encoded = token[len(COMPACT_PREFIX):]
+        try:
+            raw = base64.b32decode(encoded + "=" * (-len(encoded) % 8))
+        except binascii.Error:
+            return None
+        if len(raw) <= COMPACT_TAG_BYTES or raw[0] != COMPACT_VERSION:
+            return None
+        body, tag = raw[:-COMPACT_TAG_BYTES], raw[-COMPACT_TAG_BYTES:]
+        try:
+            asset_id, offset = _get_varint(body, 1)
+            timestamp, offset = _get_varint(body, offset)
+        except ValueError:
+            return None
+        offset += COMPACT_NONCE_BYTES
+        if offset >= len(body) or offset + 1 + body[offset] != len(body):
+            return None
+        if not hmac.compare_digest(tag, self._tag(body)):
+            return None
+        try:
+            student_id = body[offset + 1:].decode()
+        except UnicodeDecodeError:
+            return None
+        return asset_id, student_id, timestamp
@@ -0,0 +1,55 @@
+import os
+
+try:
+    import qrcode
+    from PIL import Image, ImageDraw
+except ImportError:  # optional; only needed to render printable sheets
+    qrcode = None
+
+class StickerSheetWriter:
+    """Lay QR stickers out on printable pages, writing each page when full.
+
+    Only one page is held in memory, so arbitrarily many stickers can be
+    rendered as a stream. Pages are written as PNG or PDF files named
+    ``stickers-0001.png`` and so on.
+    """
+
+    def __init__(self, out_dir, fmt="png", columns=4, rows=6, cell_size=300, label_height=40):
+        if qrcode is None:
+            raise RuntimeError("Rendering sticker sheets requires the 'qrcode[pil]' package")
+        if fmt not in ("png", "pdf"):
+            raise ValueError("fmt must be png or pdf")
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.columns = columns
+        self.rows = rows
+        self.cell_size = cell_size
+        self.label_height = label_height
+        self.pages = 0
+        self._pending = []
+
+    def add(self, label, qr_data):
+        self._pending.append((label, qr_data))
+        if len(self._pending) == self.columns * self.rows:
+            self._write_page()
+
+    def close(self):
+        if self._pending:
+            self._write_page()
+        return self.pages
+
+    def _write_page(self):
+        cell_height = self.cell_size + self.label_height
+        page = Image.new("RGB", (self.columns * self.cell_size, self.rows * cell_height), "white")
+        draw = ImageDraw.Draw(page)
+        for index, (label, qr_data) in enumerate(self._pending):
+            x = (index % self.columns) * self.cell_size
+            y = (index // self.columns) * cell_height
+            image = qrcode.make(qr_data).get_image().convert("RGB").resize((self.cell_size, self.cell_size))
+            page.paste(image, (x, y))
+            draw.text((x + 10, y + self.cell_size + 10), str(label), fill="black")
+        self.pages += 1
+        path = os.path.join(self.out_dir, f"stickers-{self.pages:04d}.{self.fmt}")
+        page.save(path, "PDF" if self.fmt == "pdf" else "PNG")
+        self._pending = []
@@ -1,48 +1,112 @@
-import base64
-import hashlib
-import hmac
 import secrets
-from datetime import datetime, timedelta
+import time
 from flask import current_app
-from backend.models.asset import Asset
+from backend.qr.cache import qr_cache
+from backend.utils.metrics import timed
+from backend.utils.records import gate_records
+from backend.qr.compact import COMPACT_PREFIX, CompactQRCodec
+from backend.utils.tokens import TokenCodec, get_codec
+
+def sign_qr_payload(secret_key, asset_id, owner_student_id, serial_number, nonce, timestamp, fmt="pipe"):
+    """Build the signed QR payload for one asset"""
+    if fmt == "compact":
+        return CompactQRCodec(secret_key).encode(asset_id, owner_student_id, bytes.fromhex(nonce), timestamp)
+    return TokenCodec(secret_key, field_count=5).encode(
+        [asset_id, owner_student_id, serial_number, nonce, timestamp], fmt=fmt
+    )
 
 def generate_qr_signature(asset):
-    timestamp = int(datetime.utcnow().timestamp())
+    fmt = current_app.config.get("QR_TOKEN_FORMAT", "pipe")
     nonce = secrets.token_hex(8)
-    message = f"{asset.asset_id}|{asset.owner_student_id}|{asset.serial_number}|{nonce}|{timestamp}"
-    signature = hmac.new(
-        current_app.config["QR_SECRET_KEY"].encode(),
-        message.encode(),
-        hashlib.sha256
-    ).hexdigest()
-    qr_data = f"{message}|{signature}"
-    return base64.urlsafe_b64encode(qr_data.encode()).decode()
+    timestamp = int(time.time())
+    if fmt == "compact":
+        return get_codec("qr_compact").encode(asset.asset_id, asset.owner_student_id, bytes.fromhex(nonce), timestamp)
+    return get_codec("qr").encode(
+        [asset.asset_id, asset.owner_student_id, asset.serial_number, nonce, timestamp], fmt=fmt
+    )
 
-def verify_qr(qr_data):
-    try:
-        decoded = base64.urlsafe_b64decode(qr_data.encode()).decode()
-        parts = decoded.split('|')
-        if len(parts) != 6:
-            return None
+def _authenticate(qr_data):
+    """Check the HMAC of a QR payload; returns ``(claims, issued_at)`` or None.
 
-        asset_id, student_id, serial_number, nonce, timestamp, signature = parts
-        message = f"{asset_id}|{student_id}|{serial_number}|{nonce}|{timestamp}"
-        expected_signature = hmac.new(
-            current_app.config["QR_SECRET_KEY"].encode(),
-            message.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        if not hmac.compare_digest(signature, expected_signature):
-            return None
-        qr_time = datetime.fromtimestamp(int(timestamp))
-        current_time = datetime.utcnow()
-        if current_time - qr_time > timedelta(hours=current_app.config.get("QR_VALIDITY_HOURS", 24)):
-            return None
-        asset = Asset.query.get(int(asset_id))
-        if not asset or asset.serial_number != serial_number:
+    Compact payloads carry no serial number, so their claims hold None there.
+    """
+    if isinstance(qr_data, str) and qr_data.startswith(COMPACT_PREFIX):
+        decoded = get_codec("qr_compact").decode(qr_data)
+        if decoded is None:
             return None
-        if str(asset.owner_student_id) != str(student_id):
-            return None
-        return asset
-    except Exception:
+        asset_id, student_id, timestamp = decoded
+        return (asset_id, student_id, None), timestamp
+    fields = get_codec("qr").decode(qr_data)
+    if fields is None:
+        return None
+    asset_id, student_id, serial_number, _, timestamp = fields
+    if not asset_id.isdigit() or not timestamp.isdigit():
         return None
+    return (int(asset_id), student_id, serial_number), int(timestamp)
+
+def qr_validity_seconds():
+    return current_app.config.get("QR_VALIDITY_HOURS", 24) * 3600
+
+def _is_expired(issued_at):
+    return int(time.time()) - issued_at > qr_validity_seconds()
+
+def qr_issued_at(qr_data):
+    """Authenticated issue time of a QR payload in epoch seconds, or None"""
+    authenticated = _authenticate(qr_data)
+    return authenticated[1] if authenticated else None
+
+def decode_qr(qr_data):
+    """Authenticate a QR payload without touching the database.
+
+    Returns ``(asset_id, student_id, serial_number)`` or None.
+    """
+    authenticated = _authenticate(qr_data)
+    if not authenticated or _is_expired(authenticated[1]):
+        return None
+    return authenticated[0]
+
+def qr_matches_asset(claims, asset):
+    """Check decoded QR claims against the asset row they refer to"""
+    if not asset:
+        return False
+    _, student_id, serial_number = claims
+    if serial_number is not None and asset.serial_number != serial_number:
+        return False
+    return str(asset.owner_student_id) == str(student_id)
+
+def verify_qr_many(qr_list):
+    """Verify several QR payloads, serving repeat scans from the QR cache.
+
+    Returns ``(claims, asset)`` pairs in input order; ``claims`` is None for
+    payloads that fail authentication and ``asset`` is None when the payload
+    does not match a registered asset. Authenticated payloads are cached by
+    the QR cache and their asset rows come from the gate record cache, which
+    resolves all misses with a single query.
+    """
+    authenticated = []
+    for qr_data in qr_list:
+        cached = qr_cache.get(qr_data)
+        if cached is None:
+            with timed("qr_verify"):
+                cached = _authenticate(qr_data)
+            if cached is not None and not _is_expired(cached[1]):
+                remaining = cached[1] + qr_validity_seconds() - time.time()
+                qr_cache.put(qr_data, cached[0], cached[1], ttl=remaining)
+        if cached is None or _is_expired(cached[1]):
+            authenticated.append(None)
+        else:
+            authenticated.append(cached[0])
+
+    assets = gate_records.get_assets({claims[0] for claims in authenticated if claims})
+    results = []
+    for claims in authenticated:
+        if claims is None:
+            results.append((None, None))
+            continue
+        asset = assets.get(claims[0])
+        results.append((claims, asset if qr_matches_asset(claims, asset) else None))
+    return results
+
+def verify_qr(qr_data):
+    _, asset = verify_qr_many([qr_data])[0]
+    return asset
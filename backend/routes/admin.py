@@ -1,24 +1,87 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import io
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import get_jwt_identity
 from backend.models.student import Student
 from backend.models.asset import Asset
-from backend.models.operator import Operator
+from backend.models.operator import Operator, DisabledOperator
 from backend.qr.verify import generate_qr_signature
+from backend.qr.cache import qr_cache
+from backend.utils.records import gate_records
+from backend.jobs.asset_import import STREAM_FORMATS, iter_records, import_assets
+from backend.utils.authz import admin_required, operator_directory, DISABLED_ROLE, OPERATOR_ROLES
+from backend.utils.cache import TTLCache
+from backend.utils.stats import compute_statistics, compute_analytics, BUCKET_SECONDS
+from backend.utils.timestamps import parse_utc
 from backend.app import db
 
 bp = Blueprint("admin", __name__, url_prefix="/admin")
 
+ASSET_LIST_FIELDS = [
+    "asset_id", "owner_student_id", "serial_number", "brand",
+    "color", "visible_specs", "status", "registered_at"
+]
+STUDENT_LIST_FIELDS = ["student_id", "full_name", "status"]
+
+# Total row counts per (listing, filter) so paging does not recount every time
+_listing_counts = TTLCache(maxsize=256, ttl=30)
+
+def _listing(name, model, key_column, filters, allowed_fields):
+    """Paginated listing with projection and a cached total.
+
+    Pages by ``page`` (offset) or, for deep pages, by ``after`` (keyset on
+    the primary key). ``fields`` limits which columns are selected.
+    """
+    per_page = request.args.get("per_page", current_app.config.get("ADMIN_LIST_PAGE_SIZE", 100), type=int)
+    per_page = max(1, min(per_page, current_app.config.get("ADMIN_LIST_MAX_PAGE_SIZE", 1000)))
+    page = max(1, request.args.get("page", 1, type=int))
+    after = request.args.get("after")
+    
+    fields = allowed_fields
+    if request.args.get("fields"):
+        fields = [field.strip() for field in request.args["fields"].split(",") if field.strip()]
+        unknown = set(fields) - set(allowed_fields)
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+        if key_column.key not in fields:
+            fields = [key_column.key] + fields
+    
+    count_key = (name, tuple(sorted(
+        (arg, value) for arg, value in request.args.items()
+        if arg not in ("page", "per_page", "after", "fields")
+    )))
+    total = _listing_counts.get(count_key)
+    if total is None:
+        total = db.session.execute(db.select(db.func.count()).select_from(model).where(*filters)).scalar()
+        _listing_counts.set(count_key, total)
+    
+    statement = db.select(*[getattr(model, field) for field in fields]).where(*filters).order_by(key_column)
+    if after is not None:
+        if key_column.type.python_type is int:
+            if not after.isdigit():
+                return jsonify({"error": "after must be an integer"}), 400
+            after = int(after)
+        statement = statement.where(key_column > after)
+    else:
+        statement = statement.offset((page - 1) * per_page)
+    rows = db.session.execute(statement.limit(per_page)).all()
+    
+    items = [
+        {field: value.isoformat() if isinstance(value, datetime) else value for field, value in row._mapping.items()}
+        for row in rows
+    ]
+    return jsonify({
+        name: items,
+        "total": total,
+        "page": None if after is not None else page,
+        "per_page": per_page,
+        "next_after": items[-1][key_column.key] if len(items) == per_page else None
+    }), 200
+
 @bp.route("/register-asset", methods=["POST"])
-@jwt_required()
+@admin_required
 def register_asset():
     """Register new asset with QR generation"""
-    # Check if user is admin
-    operator_id = get_jwt_identity()
-    operator = Operator.query.get(operator_id)
-    
-    if not operator or operator.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
-    
     data = request.json
     
     # Validate required fields
@@ -61,6 +124,8 @@ def register_asset():
     
     db.session.add(asset)
     db.session.commit()
+    gate_records.invalidate(student_ids=[asset.owner_student_id])
+    _listing_counts.clear()
     
     # Generate QR signature after asset has ID
     qr_signature = generate_qr_signature(asset)
@@ -75,33 +140,68 @@ def register_asset():
         "student": student.to_dict()
     }), 201
 
-@bp.route("/assets", methods=["GET"])
-@jwt_required()
-def get_all_assets():
-    """Get all registered assets"""
-    operator_id = get_jwt_identity()
-    operator = Operator.query.get(operator_id)
+@bp.route("/assets/import", methods=["POST"])
+@admin_required
+def import_assets_endpoint():
+    """Bulk-register assets from CSV or NDJSON"""
+    upload = request.files.get("file")
+    if upload:
+        stream = io.TextIOWrapper(upload.stream, encoding="utf-8", newline="")
+        fmt = "ndjson" if upload.filename.lower().endswith((".ndjson", ".jsonl")) else "csv"
+        supported = STREAM_FORMATS
+    elif request.mimetype in ("text/csv", "application/x-ndjson"):
+        stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+        supported = STREAM_FORMATS
+    elif request.is_json and isinstance(request.get_json(silent=True), list):
+        stream, fmt = None, "json"
+        supported = ("json",)
+    else:
+        return jsonify({"error": "Send a CSV/NDJSON file or a JSON list of assets"}), 400
+    fmt = request.args.get("format", fmt)
+    if fmt not in supported:
+        return jsonify({"error": f"format must be {' or '.join(supported)} for this body"}), 400
     
-    if not operator or operator.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
+    if fmt == "json":
+        records = enumerate((r if isinstance(r, dict) else None for r in request.json), start=1)
+    else:
+        records = iter_records(stream, fmt)
     
-    assets = Asset.query.all()
+    batch_size = current_app.config.get("ASSET_IMPORT_BATCH_SIZE", 500)
+    summary = {"created": 0, "conflict": 0, "error": 0}
+    report = []
+    for entry in import_assets(records, batch_size=batch_size):
+        summary[entry["status"]] += 1
+        report.append(entry)
+    _listing_counts.clear()
     
     return jsonify({
-        "assets": [asset.to_dict() for asset in assets]
+        "summary": summary,
+        "report": report
     }), 200
 
+@bp.route("/assets", methods=["GET"])
+@admin_required
+def get_all_assets():
+    """Get registered assets, paginated and searchable"""
+    filters = []
+    if request.args.get("q"):
+        filters.append(Asset.serial_number.startswith(request.args["q"], autoescape=True))
+    if request.args.get("owner"):
+        filters.append(Asset.owner_student_id == request.args["owner"])
+    if request.args.get("brand"):
+        filters.append(Asset.brand == request.args["brand"])
+    if request.args.get("status"):
+        filters.append(Asset.status == request.args["status"])
+    
+    return _listing("assets", Asset, Asset.asset_id, filters, ASSET_LIST_FIELDS)
+
 @bp.route("/asset/<int:asset_id>", methods=["GET", "PUT", "DELETE"])
-@jwt_required()
+@admin_required
 def manage_asset(asset_id):
     """Get, update, or delete asset"""
-    operator_id = get_jwt_identity()
-    operator = Operator.query.get(operator_id)
-    
-    if not operator or operator.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
-    
     asset = Asset.query.get_or_404(asset_id)
+    previous_owner = asset.owner_student_id
     
     if request.method == "GET":
         return jsonify({"asset": asset.to_dict()}), 200
@@ -125,6 +225,9 @@ def manage_asset(asset_id):
         if regenerate_qr:
             asset.qr_signature = generate_qr_signature(asset)
         db.session.commit()
+        qr_cache.invalidate_asset(asset_id)
+        gate_records.invalidate(student_ids={previous_owner, asset.owner_student_id}, asset_ids=[asset_id])
+        _listing_counts.clear()
         
         return jsonify({
             "message": "Asset updated successfully",
@@ -134,63 +237,111 @@ def manage_asset(asset_id):
     elif request.method == "DELETE":
         db.session.delete(asset)
         db.session.commit()
+        qr_cache.invalidate_asset(asset_id)
+        gate_records.invalidate(student_ids=[previous_owner], asset_ids=[asset_id])
+        _listing_counts.clear()
         
         return jsonify({"message": "Asset deleted successfully"}), 200
 
-@bp.route("/students", methods=["GET"])
-@jwt_required()
-def get_all_students():
-    """Get all students"""
-    operator_id = get_jwt_identity()
-    operator = Operator.query.get(operator_id)
+@bp.route("/cache-stats", methods=["GET"])
+@admin_required
+def get_cache_stats():
+    """Get hit/miss counters of in-process caches"""
+    return jsonify({
+        "qr_cache": qr_cache.stats(),
+        "record_cache": gate_records.stats(),
+        "operator_cache": operator_directory.stats()
+    }), 200
+
+@bp.route("/operator/<int:user_id>/disable", methods=["POST"])
+@admin_required
+def disable_operator(user_id):
+    """Disable an operator and revoke their outstanding tokens"""
+    if str(user_id) == str(get_jwt_identity()):
+        return jsonify({"error": "Cannot disable yourself"}), 400
     
-    if not operator or operator.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
+    operator = Operator.query.get_or_404(user_id)
+    if operator.is_active:
+        operator.disabled_record = DisabledOperator(disabled_by=int(get_jwt_identity()))
+        db.session.commit()
+    operator_directory.revoke(user_id)
     
-    students = Student.query.all()
+    return jsonify({
+        "message": "Operator disabled",
+        "user": operator.to_dict()
+    }), 200
+
+@bp.route("/operator/<int:user_id>/enable", methods=["POST"])
+@admin_required
+def enable_operator(user_id):
+    """Re-enable a disabled operator with the role they had before"""
+    operator = Operator.query.get_or_404(user_id)
+    if operator.role == DISABLED_ROLE:
+        # Disabled before roles were preserved: the caller has to pick one
+        role = (request.get_json(silent=True) or {}).get("role")
+        if role not in OPERATOR_ROLES:
+            return jsonify({"error": f"role must be one of {', '.join(OPERATOR_ROLES)}"}), 400
+        operator.role = role
+    operator.disabled_record = None
+    db.session.commit()
+    operator_directory.restore(user_id)
     
     return jsonify({
-        "students": [student.to_dict() for student in students]
+        "message": "Operator enabled",
+        "user": operator.to_dict()
     }), 200
 
+@bp.route("/students", methods=["GET"])
+@admin_required
+def get_all_students():
+    """Get students, paginated and searchable"""
+    filters = []
+    if request.args.get("q"):
+        q = request.args["q"]
+        filters.append(db.or_(
+            Student.student_id.startswith(q, autoescape=True),
+            Student.full_name.startswith(q, autoescape=True)
+        ))
+    if request.args.get("status"):
+        filters.append(Student.status == request.args["status"])
+    
+    return _listing("students", Student, Student.student_id, filters, STUDENT_LIST_FIELDS)
+
 @bp.route("/statistics", methods=["GET"])
-@jwt_required()
+@admin_required
 def get_statistics():
     """Get system statistics"""
-    operator_id = get_jwt_identity()
-    operator = Operator.query.get(operator_id)
-    
-    if not operator or operator.role != "admin":
-        return jsonify({"error": "Admin access required"}), 403
-    
-    from models.exit_log import ExitLog
-    from sqlalchemy import func
-    
-    # Get counts
-    total_students = Student.query.count()
-    active_students = Student.query.filter_by(status='active').count()
-    total_assets = Asset.query.count()
-    active_assets = Asset.query.filter_by(status='active').count()
-    total_exits = ExitLog.query.count()
-    
-    # Get recent exits (last 24 hours)
-    from datetime import datetime, timedelta
-    yesterday = datetime.utcnow() - timedelta(hours=24)
-    recent_exits = ExitLog.query.filter(ExitLog.timestamp >= yesterday).count()
+    return jsonify({
+        "statistics": compute_statistics()
+    }), 200
+
+@bp.route("/analytics", methods=["GET"])
+@admin_required
+def get_analytics():
+    """Get bucketed gate traffic time series"""
+    bucket = request.args.get("bucket", "hour")
+    if bucket not in BUCKET_SECONDS:
+        return jsonify({"error": "bucket must be minute, hour or day"}), 400
+    try:
+        until = parse_utc(request.args["until"]) if request.args.get("until") else datetime.utcnow()
+        default_span = timedelta(days=30) if bucket == "day" else timedelta(hours=24)
+        since = parse_utc(request.args["since"]) if request.args.get("since") else until - default_span
+        operator_id = request.args.get("operator_id", type=int)
+    except ValueError:
+        return jsonify({"error": "since and until must be ISO timestamps"}), 400
+    if since >= until:
+        return jsonify({"error": "since must be before until"}), 400
     
-    # Get exit results
-    allowed_exits = ExitLog.query.filter_by(result='ALLOWED').count()
-    blocked_exits = ExitLog.query.filter_by(result='BLOCKED').count()
+    span_seconds = (until - since).total_seconds()
+    if span_seconds / BUCKET_SECONDS[bucket] > current_app.config.get("ANALYTICS_MAX_BUCKETS", 2000):
+        return jsonify({"error": "Range too large for this bucket size"}), 400
     
     return jsonify({
-        "statistics": {
-            "total_students": total_students,
-            "active_students": active_students,
-            "total_assets": total_assets,
-            "active_assets": active_assets,
-            "total_exits": total_exits,
-            "recent_exits_24h": recent_exits,
-            "allowed_exits": allowed_exits,
-            "blocked_exits": blocked_exits
-        }
+        "analytics": compute_analytics(
+            since,
+            until,
+            bucket=bucket,
+            operator_id=operator_id,
+            top_reasons=current_app.config.get("ANALYTICS_TOP_REASONS", 5)
+        )
     }), 200
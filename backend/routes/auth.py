@@ -1,10 +1,27 @@
+import math
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, verify_jwt_in_request, get_jwt
+from flask_jwt_extended import create_access_token, verify_jwt_in_request, get_jwt, get_jwt_identity
 from backend.models.operator import Operator
+from backend.utils.authz import DISABLED_ROLE, operator_directory
+from backend.utils.passwords import password_hasher, HashingBusy
+from backend.utils.ratelimit import TokenBucketLimiter
 from backend.app import db
 
 bp = Blueprint("auth", __name__, url_prefix="/auth")
 
+_user_limiter = TokenBucketLimiter(capacity=5, refill_per_second=5 / 60)
+_ip_limiter = TokenBucketLimiter(capacity=20, refill_per_second=30 / 60)
+
+def init_login_limits(app):
+    _user_limiter.configure(app.config["LOGIN_USER_BURST"], app.config["LOGIN_USER_PER_MINUTE"] / 60)
+    _ip_limiter.configure(app.config["LOGIN_IP_BURST"], app.config["LOGIN_IP_PER_MINUTE"] / 60)
+    password_hasher.configure(
+        app.config["PASSWORD_HASH_METHOD"],
+        app.config["PASSWORD_HASH_WORKERS"],
+        app.config["PASSWORD_HASH_MAX_PENDING"],
+        app.config["PASSWORD_HASH_TIMEOUT"]
+    )
+
 @bp.route("/login", methods=["POST"])
 def login():
     data = request.json
@@ -15,10 +32,33 @@ def login():
     username = data.get("username")
     password = data.get("password")
     
+    for limiter, key in ((_user_limiter, username), (_ip_limiter, request.remote_addr)):
+        allowed, retry_after = limiter.acquire(key)
+        if not allowed:
+            response = jsonify({"error": "Too many login attempts"})
+            if retry_after is not None:
+                response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+            return response, 429
+    
     operator = Operator.query.filter_by(username=username).first()
     
-    if not operator or not operator.check_password(password):
+    try:
+        valid = bool(operator) and password_hasher.verify(operator.password_hash, password)
+    except HashingBusy:
+        return jsonify({"error": "Login temporarily unavailable, retry shortly"}), 503
+    if not valid:
         return jsonify({"error": "Invalid credentials"}), 401
+    _user_limiter.reset(username)
+    
+    if not operator.is_active or operator.role == DISABLED_ROLE:
+        return jsonify({"error": "Account disabled"}), 403
+    
+    if password_hasher.needs_rehash(operator.password_hash):
+        try:
+            operator.password_hash = password_hasher.hash(password)
+            db.session.commit()
+        except HashingBusy:
+            pass  # upgrade on a later login
     
     # Create JWT token
     access_token = create_access_token(
@@ -54,15 +94,18 @@ def register_operator():
                 return jsonify({"error": "Bootstrap token required for initial admin"}), 403
         else:
             verify_jwt_in_request()
-            claims = get_jwt()
-            if claims.get("role") != "admin":
+            # A disabled admin's token still carries the admin claim until it expires
+            if get_jwt().get("role") != "admin" or not operator_directory.is_current(get_jwt_identity(), "admin"):
                 return jsonify({"error": "Admin access required"}), 403
 
     operator = Operator(
         username=data["username"],
         role=data.get("role", "gate_operator")
     )
-    operator.set_password(data["password"])
+    try:
+        operator.password_hash = password_hasher.hash(data["password"])
+    except HashingBusy:
+        return jsonify({"error": "Registration temporarily unavailable, retry shortly"}), 503
     
     db.session.add(operator)
     db.session.commit()
@@ -1,19 +1,62 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from backend.models.student import Student
-from backend.models.asset import Asset
+import base64
+import csv
+import io
+import itertools
+import json
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import get_jwt_identity
 from backend.models.exit_log import ExitLog
-from backend.qr.verify import verify_qr
+from backend.models.gate_journal import GateJournalCursor
+from backend.jobs.log_retention import archive_path, iter_archived_logs
+from backend.offline.snapshot import build_snapshot, snapshot_key
+from backend.qr.verify import verify_qr, verify_qr_many
 from backend.utils.crypto import generate_exit_token, verify_exit_token
+from backend.utils.authz import operator_required
+from backend.utils.nonce import claim_once, release_claim
+from backend.utils.records import gate_records
+from backend.utils.audit import record_exit, record_exits, write_exit_logs
+from backend.utils.timestamps import parse_utc
 from backend.app import db
 
 def _is_valid_student_id(student_id):
     return bool(student_id and len(student_id) >= 3)
 
+def _token_ttl():
+    return current_app.config.get("EXIT_TOKEN_TTL_SECONDS", 300)
+
+def _qr_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return value
+    return None
+
+def _check_assets(student_id, qr_data):
+    """Decide each scanned QR for the given student.
+
+    Returns a list of ``(asset, result, reason)`` in the order scanned.
+    """
+    decisions = []
+    for _, asset in verify_qr_many(qr_data):
+        if not asset:
+            decisions.append((None, "BLOCKED", "Invalid QR"))
+        elif str(asset.owner_student_id) != str(student_id):
+            decisions.append((asset, "BLOCKED", "Ownership mismatch"))
+        elif asset.status != "active":
+            decisions.append((asset, "BLOCKED", f"Asset {asset.status}"))
+        else:
+            decisions.append((asset, "ALLOWED", "Exit verified successfully"))
+    return decisions
+
 bp = Blueprint("gate", __name__, url_prefix="/gate/exit")
 
+LOG_EXPORT_FIELDS = ["log_id", "timestamp", "student_id", "asset_id", "operator_id", "result", "reason"]
+
 @bp.route("/scan-student", methods=["POST"])
-@jwt_required()
+@operator_required
 def scan_student():
     """Step 1: Verify student is active"""
     student_id = request.json.get("student_id")
@@ -24,46 +67,31 @@ def scan_student():
     if not _is_valid_student_id(student_id):
         return jsonify({"status": "BLOCKED", "reason": "Invalid student ID format"}), 400
     
-    student = Student.query.get(student_id)
+    student, asset_count = gate_records.get_student(student_id)
     
     if not student:
         # Log blocked attempt
-        log = ExitLog(
-            student_id=student_id,
-            operator_id=operator_id,
-            result="BLOCKED",
-            reason="Student not found"
-        )
-        db.session.add(log)
-        db.session.commit()
+        record_exit(student_id, operator_id, "BLOCKED", "Student not found")
         return jsonify({"status": "BLOCKED", "reason": "Student not found"}), 404
     
     if student.status != "active":
         # Log blocked attempt
-        log = ExitLog(
-            student_id=student_id,
-            operator_id=operator_id,
-            result="BLOCKED",
-            reason=f"Student inactive: {student.status}"
-        )
-        db.session.add(log)
-        db.session.commit()
+        record_exit(student_id, operator_id, "BLOCKED", f"Student inactive: {student.status}")
         return jsonify({"status": "BLOCKED", "reason": "Student inactive"}), 403
     
     # Check if student has registered assets
-    assets = Asset.query.filter_by(owner_student_id=student_id, status='active').all()
-    has_assets = len(assets) > 0
+    has_assets = asset_count > 0
     
     return jsonify({
         "status": "OK",
         "student": student.to_dict(),
         "has_assets": has_assets,
-        "asset_count": len(assets),
+        "asset_count": asset_count,
         "exit_token": generate_exit_token(student_id, operator_id, has_assets)
     }), 200
 
 @bp.route("/scan-asset", methods=["POST"])
-@jwt_required()
+@operator_required
 def scan_asset():
     """Step 2: Verify asset and ownership"""
     data = request.json
@@ -76,80 +104,39 @@ def scan_asset():
         return jsonify({"status": "BLOCKED", "reason": "Student ID, QR data, and exit token required"}), 400
     if not _is_valid_student_id(student_id):
         return jsonify({"status": "BLOCKED", "reason": "Invalid student ID format"}), 400
-    if not verify_exit_token(exit_token, student_id, operator_id, require_has_assets=True):
-        log = ExitLog(
-            student_id=student_id,
-            operator_id=operator_id,
-            result="BLOCKED",
-            reason="Invalid or expired exit token"
-        )
-        db.session.add(log)
-        db.session.commit()
+    token_nonce = verify_exit_token(exit_token, student_id, operator_id, require_has_assets=True)
+    if not token_nonce:
+        record_exit(student_id, operator_id, "BLOCKED", "Invalid or expired exit token")
         return jsonify({"status": "BLOCKED", "reason": "Invalid or expired exit token"}), 403
+    # One exit token may clear each asset once; replays are refused without DB work
+    if not claim_once("scan-asset", token_nonce, qr_data, ttl=_token_ttl()):
+        return jsonify({"status": "BLOCKED", "reason": "Scan already processed"}), 409
     
     # Verify student exists and is active
-    student = Student.query.get(student_id)
+    student, _ = gate_records.get_student(student_id)
     if not student or student.status != "active":
-        log = ExitLog(
-            student_id=student_id,
-            operator_id=operator_id,
-            result="BLOCKED",
-            reason="Student invalid or inactive"
-        )
-        db.session.add(log)
-        db.session.commit()
+        record_exit(student_id, operator_id, "BLOCKED", "Student invalid or inactive")
         return jsonify({"status": "BLOCKED", "reason": "Student invalid or inactive"}), 403
     
     # Verify QR
     asset = verify_qr(qr_data)
     if not asset:
-        log = ExitLog(
-            student_id=student_id,
-            operator_id=operator_id,
-            result="BLOCKED",
-            reason="Invalid QR"
-        )
-        db.session.add(log)
-        db.session.commit()
+        record_exit(student_id, operator_id, "BLOCKED", "Invalid QR")
         return jsonify({"status": "BLOCKED", "reason": "Invalid QR"}), 403
     
     # Check ownership
     if str(asset.owner_student_id) != str(student_id):
-        log = ExitLog(
-            student_id=student_id,
-            asset_id=asset.asset_id,
-            operator_id=operator_id,
-            result="BLOCKED",
-            reason="Ownership mismatch"
-        )
-        db.session.add(log)
-        db.session.commit()
+        record_exit(student_id, operator_id, "BLOCKED", "Ownership mismatch", asset_id=asset.asset_id)
         return jsonify({"status": "BLOCKED", "reason": "Ownership mismatch"}), 403
     
     # Check asset status
     if asset.status != "active":
         reason = f"Asset {asset.status}"
-        log = ExitLog(
-            student_id=student_id,
-            asset_id=asset.asset_id,
-            operator_id=operator_id,
-            result="BLOCKED",
-            reason=reason
-        )
-        db.session.add(log)
-        db.session.commit()
+        record_exit(student_id, operator_id, "BLOCKED", reason, asset_id=asset.asset_id)
         return jsonify({"status": "BLOCKED", "reason": reason}), 403
     
     # ALLOWED - Create exit log
-    log = ExitLog(
-        student_id=student_id,
-        asset_id=asset.asset_id,
-        operator_id=operator_id,
-        result="ALLOWED",
-        reason="Exit verified successfully"
-    )
-    db.session.add(log)
-    db.session.commit()
+    record_exit(student_id, operator_id, "ALLOWED", "Exit verified successfully", asset_id=asset.asset_id)
     
     return jsonify({
         "status": "ALLOWED",
@@ -158,8 +145,70 @@ def scan_asset():
         "asset": asset.to_dict()
     }), 200
 
+@bp.route("/scan-assets", methods=["POST"])
+@operator_required
+def scan_assets():
+    """Step 2 (batch): Verify several assets and ownership at once"""
+    data = request.json or {}
+    student_id = data.get("student_id")
+    qr_data = _qr_list(data.get("qr_data"))
+    exit_token = data.get("exit_token")
+    operator_id = get_jwt_identity()
+
+    if not student_id or not qr_data or not exit_token:
+        return jsonify({"status": "BLOCKED", "reason": "Student ID, QR data, and exit token required"}), 400
+    if not _is_valid_student_id(student_id):
+        return jsonify({"status": "BLOCKED", "reason": "Invalid student ID format"}), 400
+    if len(qr_data) > current_app.config.get("GATE_MAX_BATCH_ASSETS", 20):
+        return jsonify({"status": "BLOCKED", "reason": "Too many assets in one request"}), 400
+    token_nonce = verify_exit_token(exit_token, student_id, operator_id, require_has_assets=True)
+    if not token_nonce:
+        record_exit(student_id, operator_id, "BLOCKED", "Invalid or expired exit token")
+        return jsonify({"status": "BLOCKED", "reason": "Invalid or expired exit token"}), 403
+    if len(set(qr_data)) != len(qr_data):
+        return jsonify({"status": "BLOCKED", "reason": "Duplicate QR data in request"}), 400
+    claimed = [claim_once("scan-asset", token_nonce, item, ttl=_token_ttl()) for item in qr_data]
+    if not all(claimed):
+        # Leave the fresh items in this batch scannable with the same token
+        for item, fresh in zip(qr_data, claimed):
+            if fresh:
+                release_claim("scan-asset", token_nonce, item)
+        return jsonify({"status": "BLOCKED", "reason": "Scan already processed"}), 409
+
+    student, _ = gate_records.get_student(student_id)
+    if not student or student.status != "active":
+        record_exit(student_id, operator_id, "BLOCKED", "Student invalid or inactive")
+        return jsonify({"status": "BLOCKED", "reason": "Student invalid or inactive"}), 403
+
+    decisions = _check_assets(student_id, qr_data)
+
+    record_exits([
+        {
+            "student_id": student_id,
+            "asset_id": asset.asset_id if asset else None,
+            "operator_id": operator_id,
+            "result": result,
+            "reason": reason
+        }
+        for asset, result, reason in decisions
+    ])
+
+    allowed = all(result == "ALLOWED" for _, result, _ in decisions)
+    return jsonify({
+        "status": "ALLOWED" if allowed else "BLOCKED",
+        "student": student.to_dict(),
+        "results": [
+            {
+                "status": result,
+                "reason": reason,
+                "asset": asset.to_dict() if asset else None
+            }
+            for asset, result, reason in decisions
+        ]
+    }), 200 if allowed else 403
+
 @bp.route("/exit-without-asset", methods=["POST"])
-@jwt_required()
+@operator_required
 def exit_without_asset():
     """Student exit without carrying any asset"""
     student_id = request.json.get("student_id")
@@ -170,50 +219,24 @@ def exit_without_asset():
         return jsonify({"status": "BLOCKED", "reason": "Student ID and exit token required"}), 400
     if not _is_valid_student_id(student_id):
         return jsonify({"status": "BLOCKED", "reason": "Invalid student ID format"}), 400
-    if not verify_exit_token(exit_token, student_id, operator_id, require_has_assets=False):
-        log = ExitLog(
-            student_id=student_id,
-            operator_id=operator_id,
-            result="BLOCKED",
-            reason="Invalid or expired exit token"
-        )
-        db.session.add(log)
-        db.session.commit()
+    token_nonce = verify_exit_token(exit_token, student_id, operator_id, require_has_assets=False)
+    if not token_nonce:
+        record_exit(student_id, operator_id, "BLOCKED", "Invalid or expired exit token")
         return jsonify({"status": "BLOCKED", "reason": "Invalid or expired exit token"}), 403
+    if not claim_once("exit-without-asset", token_nonce, ttl=_token_ttl()):
+        return jsonify({"status": "BLOCKED", "reason": "Exit token already used"}), 409
     
-    student = Student.query.get(student_id)
+    student, asset_count = gate_records.get_student(student_id)
     if not student or student.status != "active":
-        log = ExitLog(
-            student_id=student_id,
-            operator_id=operator_id,
-            result="BLOCKED",
-            reason="Student invalid or inactive"
-        )
-        db.session.add(log)
-        db.session.commit()
+        record_exit(student_id, operator_id, "BLOCKED", "Student invalid or inactive")
         return jsonify({"status": "BLOCKED", "reason": "Student invalid or inactive"}), 403
 
-    assets = Asset.query.filter_by(owner_student_id=student_id, status='active').all()
-    if len(assets) > 0:
-        log = ExitLog(
-            student_id=student_id,
-            operator_id=operator_id,
-            result="BLOCKED",
-            reason="Registered assets present"
-        )
-        db.session.add(log)
-        db.session.commit()
+    if asset_count > 0:
+        record_exit(student_id, operator_id, "BLOCKED", "Registered assets present")
         return jsonify({"status": "BLOCKED", "reason": "Registered assets present"}), 403
     
     # Log exit without asset
-    log = ExitLog(
-        student_id=student_id,
-        operator_id=operator_id,
-        result="ALLOWED",
-        reason="Exit without registered assets"
-    )
-    db.session.add(log)
-    db.session.commit()
+    record_exit(student_id, operator_id, "ALLOWED", "Exit without registered assets")
     
     return jsonify({
         "status": "ALLOWED",
@@ -221,15 +244,273 @@ def exit_without_asset():
         "student": student.to_dict()
     }), 200
 
+@bp.route("/verify", methods=["POST"])
+@operator_required
+def verify_exit():
+    """Verify student and all carried assets in a single request"""
+    data = request.json or {}
+    student_id = data.get("student_id")
+    qr_data = _qr_list(data.get("qr_data"))
+    operator_id = get_jwt_identity()
+
+    if not student_id:
+        return jsonify({"status": "BLOCKED", "reason": "Student ID required"}), 400
+    if not _is_valid_student_id(student_id):
+        return jsonify({"status": "BLOCKED", "reason": "Invalid student ID format"}), 400
+    if qr_data is None:
+        return jsonify({"status": "BLOCKED", "reason": "qr_data must be a string or a list of strings"}), 400
+    if len(qr_data) > current_app.config.get("GATE_MAX_BATCH_ASSETS", 20):
+        return jsonify({"status": "BLOCKED", "reason": "Too many assets in one request"}), 400
+    if len(set(qr_data)) != len(qr_data):
+        return jsonify({"status": "BLOCKED", "reason": "Duplicate QR data in request"}), 400
+
+    student, asset_count = gate_records.get_student(student_id)
+    if not student:
+        record_exit(student_id, operator_id, "BLOCKED", "Student not found")
+        return jsonify({"status": "BLOCKED", "reason": "Student not found"}), 404
+    if student.status != "active":
+        # The log keeps the status; the gate only learns the student cannot leave
+        record_exit(student_id, operator_id, "BLOCKED", f"Student inactive: {student.status}")
+        return jsonify({"status": "BLOCKED", "reason": "Student inactive"}), 403
+
+    if not qr_data:
+        if asset_count > 0:
+            decisions = [(None, "BLOCKED", "Registered assets present")]
+        else:
+            decisions = [(None, "ALLOWED", "Exit without registered assets")]
+    else:
+        decisions = _check_assets(student_id, qr_data)
+
+    record_exits([
+        {
+            "student_id": student_id,
+            "asset_id": asset.asset_id if asset else None,
+            "operator_id": operator_id,
+            "result": result,
+            "reason": reason
+        }
+        for asset, result, reason in decisions
+    ])
+
+    allowed = all(result == "ALLOWED" for _, result, _ in decisions)
+    return jsonify({
+        "status": "ALLOWED" if allowed else "BLOCKED",
+        "reason": decisions[0][2] if len(decisions) == 1 else None,
+        "student": student.to_dict(),
+        "asset_count": asset_count,
+        "results": [
+            {
+                "status": result,
+                "reason": reason,
+                "asset": asset.to_dict() if asset else None
+            }
+            for asset, result, reason in decisions
+        ]
+    }), 200 if allowed else 403
+
+def _parse_time(value):
+    return parse_utc(value) if value else None
+
+def _encode_cursor(timestamp, log_id):
+    raw = f"{timestamp.isoformat()}|{log_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    timestamp, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(timestamp), int(log_id)
+
+def _log_filters(args):
+    """Build WHERE clauses from query args; raises ValueError on bad input"""
+    filters = []
+    if args.get("student_id"):
+        filters.append(ExitLog.student_id == args["student_id"])
+    if args.get("operator_id"):
+        filters.append(ExitLog.operator_id == int(args["operator_id"]))
+    if args.get("asset_id"):
+        filters.append(ExitLog.asset_id == int(args["asset_id"]))
+    if args.get("result"):
+        result = args["result"].upper()
+        if result not in ("ALLOWED", "BLOCKED"):
+            raise ValueError("result must be ALLOWED or BLOCKED")
+        filters.append(ExitLog.result == result)
+    since = _parse_time(args.get("since"))
+    if since:
+        filters.append(ExitLog.timestamp >= since)
+    until = _parse_time(args.get("until"))
+    if until:
+        filters.append(ExitLog.timestamp < until)
+    return filters
+
+def _archive_predicate(args):
+    """Python-side version of the non-time filters for archived rows"""
+    expected = {}
+    if args.get("student_id"):
+        expected["student_id"] = args["student_id"]
+    if args.get("operator_id"):
+        expected["operator_id"] = int(args["operator_id"])
+    if args.get("asset_id"):
+        expected["asset_id"] = int(args["asset_id"])
+    if args.get("result"):
+        expected["result"] = args["result"].upper()
+    return lambda row: all(row[key] == value for key, value in expected.items())
+
+def _log_row(row):
+    return {
+        "log_id": row.log_id,
+        "timestamp": row.timestamp.isoformat(),
+        "student_id": row.student_id,
+        "asset_id": row.asset_id,
+        "operator_id": row.operator_id,
+        "result": row.result,
+        "reason": row.reason
+    }
+
 @bp.route("/logs", methods=["GET"])
-@jwt_required()
+@operator_required
 def get_exit_logs():
-    """Get recent exit logs"""
-    operator_id = get_jwt_identity()
+    """Get exit logs, newest first, one keyset page at a time"""
     limit = request.args.get("limit", 50, type=int)
-    
-    logs = ExitLog.query.order_by(ExitLog.timestamp.desc()).limit(limit).all()
-    
+    limit = max(1, min(limit, current_app.config.get("LOGS_MAX_PAGE_SIZE", 500)))
+    cursor = request.args.get("cursor")
+
+    try:
+        filters = _log_filters(request.args)
+        if cursor:
+            cursor_time, cursor_id = _decode_cursor(cursor)
+            filters.append(db.or_(
+                ExitLog.timestamp < cursor_time,
+                db.and_(ExitLog.timestamp == cursor_time, ExitLog.log_id < cursor_id)
+            ))
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid filter or cursor"}), 400
+
+    logs = (
+        ExitLog.query.filter(*filters)
+        .order_by(ExitLog.timestamp.desc(), ExitLog.log_id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = _encode_cursor(logs[-1].timestamp, logs[-1].log_id)
+
+    return jsonify({
+        "logs": [log.to_dict() for log in logs],
+        "next_cursor": next_cursor
+    }), 200
+
+@bp.route("/logs/export", methods=["GET"])
+@operator_required
+def export_exit_logs():
+    """Stream every matching exit log as NDJSON or CSV, optionally with archived months"""
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    try:
+        filters = _log_filters(request.args)
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid filter"}), 400
+
+    chunk_size = current_app.config.get("LOGS_EXPORT_CHUNK_SIZE", 1000)
+    statement = (
+        db.select(ExitLog.__table__)
+        .where(*filters)
+        .order_by(ExitLog.timestamp.desc(), ExitLog.log_id.desc())
+        .execution_options(stream_results=True, yield_per=chunk_size)
+    )
+
+    chunks = (
+        [_log_row(row) for row in chunk]
+        for chunk in db.session.execute(statement).partitions()
+    )
+    if request.args.get("include_archive", "").lower() in ("1", "true", "yes"):
+        archived = iter_archived_logs(
+            archive_path(),
+            since=_parse_time(request.args.get("since")),
+            until=_parse_time(request.args.get("until")),
+            predicate=_archive_predicate(request.args)
+        )
+        chunks = itertools.chain(chunks, iter(lambda: list(itertools.islice(archived, chunk_size)), []))
+
+    def generate():
+        header_written = False
+        for rows in chunks:
+            if export_format == "ndjson":
+                yield "".join(json.dumps(row) + "\n" for row in rows)
+                continue
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=LOG_EXPORT_FIELDS)
+            if not header_written:
+                writer.writeheader()
+                header_written = True
+            writer.writerows(rows)
+            yield buffer.getvalue()
+        if export_format == "csv" and not header_written:
+            yield ",".join(LOG_EXPORT_FIELDS) + "\r\n"
+
+    mimetype = "application/x-ndjson" if export_format == "ndjson" else "text/csv"
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=exit_logs.{export_format}"
+    })
+
+@bp.route("/snapshot", methods=["GET"])
+@operator_required
+def get_gate_snapshot():
+    """Signed snapshot (or delta since ``since``) for offline gate mode"""
+    since = request.args.get("since", type=int)
+    try:
+        secret_key = snapshot_key(current_app.config)
+    except ValueError as exc:
+        return jsonify({"error": f"Offline snapshots unavailable: {exc}"}), 503
+    return jsonify(build_snapshot(secret_key, since=since)), 200
+
+@bp.route("/journal", methods=["POST"])
+@operator_required
+def sync_gate_journal():
+    """Bulk-import decisions a gate node made while offline"""
+    data = request.json or {}
+    node_id = data.get("node_id")
+    entries = data.get("entries")
+    operator_id = get_jwt_identity()
+
+    if not node_id or not isinstance(node_id, str) or len(node_id) > 64:
+        return jsonify({"error": "node_id required"}), 400
+    if not isinstance(entries, list):
+        return jsonify({"error": "entries must be a list"}), 400
+    if len(entries) > current_app.config.get("JOURNAL_SYNC_MAX_ENTRIES", 5000):
+        return jsonify({"error": "Too many entries in one request"}), 400
+
+    rows = []
+    try:
+        for entry in entries:
+            if entry["result"] not in ("ALLOWED", "BLOCKED"):
+                raise ValueError(entry["result"])
+            rows.append((int(entry["seq"]), {
+                "timestamp": parse_utc(entry["timestamp"]),
+                "student_id": str(entry["student_id"]),
+                "asset_id": int(entry["asset_id"]) if entry.get("asset_id") is not None else None,
+                "operator_id": operator_id,
+                "result": entry["result"],
+                "reason": entry.get("reason")
+            }))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Malformed journal entry"}), 400
+
+    cursor = db.session.get(GateJournalCursor, node_id, with_for_update=True)
+    if cursor is None:
+        cursor = GateJournalCursor(node_id=node_id, last_seq=0)
+        db.session.add(cursor)
+    # Entries at or below the cursor were already synced by an earlier retry
+    fresh = sorted((row for row in rows if row[0] > cursor.last_seq), key=lambda row: row[0])
+    write_exit_logs([row for _, row in fresh])
+    if fresh:
+        cursor.last_seq = fresh[-1][0]
+    cursor.synced_at = datetime.utcnow()
+    db.session.commit()
+
     return jsonify({
-        "logs": [log.to_dict() for log in logs]
+        "accepted": len(fresh),
+        "skipped": len(rows) - len(fresh),
+        "last_seq": cursor.last_seq
     }), 200
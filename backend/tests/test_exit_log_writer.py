@@ -0,0 +1,68 @@
+from datetime import datetime
+import pytest
+from backend.app import create_app, db
+from backend.config import Config
+from backend.models.operator import Operator
+from backend.models.student import Student
+from backend.models.exit_log import ExitLog
+from backend.utils.audit import ExitLogWriter
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'writer.db'}")
+    monkeypatch.setattr(Config, "ENFORCE_HTTPS", False)
+    monkeypatch.setattr(Config, "EXIT_LOG_MODE", "sync")
+    app = create_app()
+    with app.app_context():
+        db.session.add_all([
+            Operator(username="gate", password_hash="-", role="gate_operator"),
+            Student(student_id="STU001", full_name="Student", status="active"),
+        ])
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+def _row(reason="ok", **overrides):
+    row = {"timestamp": datetime.utcnow(), "student_id": "STU001", "asset_id": None,
+           "operator_id": 1, "result": "ALLOWED", "reason": reason}
+    row.update(overrides)
+    return row
+
+def _reasons():
+    db.session.rollback()
+    return sorted(db.session.execute(db.select(ExitLog.reason)).scalars())
+
+def test_rows_are_written_in_batches(app):
+    writer = ExitLogWriter(app, batch_size=10, flush_interval=0.05)
+    writer.submit([_row(f"r{n:02d}") for n in range(25)])
+    writer.flush()
+    writer.stop()
+    assert _reasons() == [f"r{n:02d}" for n in range(25)]
+    assert writer.stats()["flushed"] == 25
+    assert writer.stats()["dropped"] == 0
+
+def test_bad_row_is_dropped_without_losing_the_rest(app):
+    writer = ExitLogWriter(app, batch_size=10, flush_interval=0.05, max_retries=2)
+    writer.submit([_row("before"), _row("bad", result=None), _row("after")])
+    writer.flush()
+    writer.stop()
+    assert _reasons() == ["after", "before"]
+    assert writer.stats()["dropped"] == 1
+
+def test_full_queue_falls_back_to_a_synchronous_write(app):
+    writer = ExitLogWriter(app, batch_size=10, flush_interval=0.05, queue_size=1, enqueue_timeout=0)
+    writer._ensure_started = lambda: None
+    writer.submit([_row("queued"), _row("sync-1"), _row("sync-2")])
+    assert _reasons() == ["sync-1", "sync-2"]
+    assert writer.stats()["sync_fallbacks"] == 1
+    writer.stop()
+    assert _reasons() == ["queued", "sync-1", "sync-2"]
+
+def test_stop_drains_queued_rows(app):
+    writer = ExitLogWriter(app, batch_size=10, flush_interval=0.05)
+    writer._ensure_started = lambda: None
+    writer.submit([_row("a"), _row("b")])
+    assert _reasons() == []
+    writer.stop()
+    assert _reasons() == ["a", "b"]
@@ -0,0 +1,59 @@
+import pytest
+from backend.app import create_app
+from backend.config import Config
+from backend.utils.nonce import LocalNonceStore, claim_once, release_claim
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'nonce.db'}")
+    monkeypatch.setattr(Config, "ENFORCE_HTTPS", False)
+    monkeypatch.setattr(Config, "NONCE_STORE_URL", "")
+    app = create_app()
+    with app.app_context():
+        yield app
+
+def test_replay_within_ttl_is_refused():
+    store = LocalNonceStore(bucket_seconds=30, clock=FakeClock())
+    assert store.add_if_absent("a", ttl=300)
+    assert not store.add_if_absent("a", ttl=300)
+    assert store.add_if_absent("b", ttl=300)
+
+def test_key_can_be_reused_after_it_expires():
+    clock = FakeClock()
+    store = LocalNonceStore(bucket_seconds=30, clock=clock)
+    assert store.add_if_absent("a", ttl=300)
+    clock.now += 299
+    assert not store.add_if_absent("a", ttl=300)
+    # Keys live until the end of their expiry bucket, never less than the TTL
+    clock.now += 31
+    assert store.add_if_absent("a", ttl=300)
+
+def test_expired_buckets_are_dropped():
+    clock = FakeClock()
+    store = LocalNonceStore(bucket_seconds=30, clock=clock)
+    for n in range(100):
+        store.add_if_absent(f"key-{n}", ttl=60)
+    assert len(store) == 100
+    clock.now += 120
+    store.add_if_absent("fresh", ttl=60)
+    assert len(store) == 1
+
+def test_discarded_key_can_be_claimed_again():
+    store = LocalNonceStore(bucket_seconds=30, clock=FakeClock())
+    store.add_if_absent("a", ttl=300)
+    store.discard("a")
+    assert store.add_if_absent("a", ttl=300)
+
+def test_claim_once_refuses_replays_until_released(app):
+    assert claim_once("exit", "STU001", "nonce-1", ttl=300)
+    assert not claim_once("exit", "STU001", "nonce-1", ttl=300)
+    assert claim_once("exit", "STU002", "nonce-1", ttl=300)
+    release_claim("exit", "STU001", "nonce-1")
+    assert claim_once("exit", "STU001", "nonce-1", ttl=300)
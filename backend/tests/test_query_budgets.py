@@ -0,0 +1,87 @@
+import threading
+import pytest
+from sqlalchemy import text
+from flask_jwt_extended import create_access_token
+from backend.app import create_app, db
+from backend.config import Config
+from backend.models.operator import Operator
+from backend.models.student import Student
+from backend.models.asset import Asset
+from backend.qr.verify import generate_qr_signature
+from backend.utils.query_profiler import assert_max_queries
+
+@pytest.fixture
+def gate(tmp_path, monkeypatch):
+    """A gate operator's client against a fresh database with caches cold"""
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'budgets.db'}")
+    monkeypatch.setattr(Config, "ENFORCE_HTTPS", False)
+    monkeypatch.setattr(Config, "EXIT_LOG_MODE", "sync")
+    app = create_app()
+    with app.app_context():
+        operator = Operator(username="gate", password_hash="-", role="gate_operator")
+        db.session.add_all([
+            operator,
+            Student(student_id="STU001", full_name="With Assets", status="active"),
+            Student(student_id="STU002", full_name="Without Assets", status="active"),
+        ])
+        db.session.flush()
+        assets = [Asset(owner_student_id="STU001", serial_number=f"SN-{n}") for n in range(3)]
+        db.session.add_all(assets)
+        db.session.flush()
+        for asset in assets:
+            asset.qr_signature = generate_qr_signature(asset)
+        db.session.commit()
+        token = create_access_token(identity=str(operator.user_id),
+                                    additional_claims={"username": "gate", "role": "gate_operator"})
+        qr_data = [asset.qr_signature for asset in assets]
+        yield app.test_client(), {"Authorization": f"Bearer {token}"}, qr_data
+        db.session.remove()
+        db.engine.dispose()
+
+def _exit_token(client, headers, student_id):
+    response = client.post("/gate/exit/scan-student", json={"student_id": student_id}, headers=headers)
+    assert response.status_code == 200
+    return response.json["exit_token"]
+
+def test_scan_student_budget(gate):
+    client, headers, _ = gate
+    # Operator check and student with its asset summary, both cold
+    with assert_max_queries(2):
+        response = client.post("/gate/exit/scan-student", json={"student_id": "STU001"}, headers=headers)
+    assert response.status_code == 200
+    with assert_max_queries(0):
+        client.post("/gate/exit/scan-student", json={"student_id": "STU001"}, headers=headers)
+
+def test_scan_assets_budget_does_not_grow_with_batch(gate):
+    client, headers, qr_data = gate
+    token = _exit_token(client, headers, "STU001")
+    # All assets in one query, then one exit log insert and one rollup upsert;
+    # the response must not reload the assets after the commit
+    with assert_max_queries(3):
+        response = client.post("/gate/exit/scan-assets",
+                               json={"student_id": "STU001", "qr_data": qr_data, "exit_token": token},
+                               headers=headers)
+    assert response.status_code == 200
+
+def test_exit_without_asset_budget(gate):
+    client, headers, _ = gate
+    token = _exit_token(client, headers, "STU002")
+    # Student and operator are cached by scan-student; only the log is written
+    with assert_max_queries(2):
+        response = client.post("/gate/exit/exit-without-asset",
+                               json={"student_id": "STU002", "exit_token": token}, headers=headers)
+    assert response.status_code == 200
+
+def test_other_threads_do_not_count(gate):
+    engine = db.engine
+    results = []
+
+    def background_query():
+        with engine.connect() as connection:
+            results.append(connection.execute(text("SELECT 1")).scalar())
+
+    with assert_max_queries(0):
+        worker = threading.Thread(target=background_query)
+        worker.start()
+        worker.join()
+    assert results == [1]
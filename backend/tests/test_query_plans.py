@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert, text
+from backend.app import create_app, db
+from backend.config import Config
+from backend.models.operator import Operator
+from backend.models.student import Student
+from backend.models.asset import Asset
+from backend.models.asset_summary import StudentAssetSummary
+from backend.models.exit_log import ExitLog
+from backend.models.exit_rollup import ExitRollup
+from backend.models.gate_change import GateChange
+from backend.utils.indexes import check_query_plans
+
+STUDENTS = 2000
+ASSETS_PER_STUDENT = 2
+LOGS = 20000
+OPERATORS = 5
+
+def _seed():
+    """Enough rows, with ANALYZE statistics, for the planner to pick real plans"""
+    now = datetime.utcnow()
+    db.session.execute(insert(Operator), [
+        {"username": f"operator-{n}", "password_hash": "-", "role": "gate_operator"} for n in range(OPERATORS)
+    ])
+    db.session.execute(insert(Student), [
+        {"student_id": f"STU{n:06d}", "full_name": f"Student {n}", "status": "active" if n % 20 else "blocked"}
+        for n in range(STUDENTS)
+    ])
+    db.session.execute(insert(Asset), [
+        {"asset_id": n + 1, "owner_student_id": f"STU{n // ASSETS_PER_STUDENT:06d}",
+         "serial_number": f"SN-{n:06d}", "qr_signature": f"qr-{n}", "status": "active" if n % 10 else "revoked"}
+        for n in range(STUDENTS * ASSETS_PER_STUDENT)
+    ])
+    db.session.execute(insert(StudentAssetSummary), [
+        {"student_id": f"STU{n:06d}", "active_assets": ASSETS_PER_STUDENT} for n in range(STUDENTS)
+    ])
+    db.session.execute(insert(ExitLog), [
+        {"timestamp": now - timedelta(minutes=n), "student_id": f"STU{n % STUDENTS:06d}",
+         "asset_id": n % (STUDENTS * ASSETS_PER_STUDENT) + 1 if n % 3 else None,
+         "operator_id": n % OPERATORS + 1, "result": "BLOCKED" if n % 7 == 0 else "ALLOWED",
+         "reason": "Invalid QR" if n % 7 == 0 else "Exit verified successfully"}
+        for n in range(LOGS)
+    ])
+    db.session.execute(insert(ExitRollup), [
+        {"bucket_start": now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hour),
+         "operator_id": operator_id, "result": "ALLOWED", "reason": "Exit verified successfully", "count": 10}
+        for hour in range(LOGS // 60) for operator_id in range(1, OPERATORS + 1)
+    ])
+    db.session.execute(insert(GateChange), [
+        {"kind": "asset", "key": str(n + 1), "changed_at": now} for n in range(STUDENTS * ASSETS_PER_STUDENT)
+    ])
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+@pytest.fixture
+def seeded_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'plans.db'}")
+    app = create_app()
+    with app.app_context():
+        _seed()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+def test_hot_queries_use_indexes(seeded_app):
+    offenders = check_query_plans()
+    assert offenders == {}, "\n".join(f"{name}: {'; '.join(scans)}" for name, scans in offenders.items())
+
+def test_plan_check_catches_a_dropped_index(seeded_app):
+    db.session.execute(text("DROP INDEX idx_exit_log_asset"))
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+    assert set(check_query_plans()) == {"logs of asset"}
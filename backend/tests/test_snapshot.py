@@ -0,0 +1,116 @@
+import copy
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from backend.app import create_app, db
+from backend.config import Config
+from backend.models.student import Student
+from backend.models.asset import Asset
+from backend.models.gate_change import GateChange
+from backend.offline.node import GateSnapshot, SnapshotError
+from backend.offline.snapshot import build_snapshot, settled_seq, sign_snapshot, snapshot_key, verify_snapshot
+from backend.qr.verify import generate_qr_signature
+
+SNAPSHOT_KEY = "s" * 40
+QR_KEY = "q" * 40
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'snapshot.db'}")
+    monkeypatch.setattr(Config, "ENFORCE_HTTPS", False)
+    monkeypatch.setattr(Config, "QR_SECRET_KEY", QR_KEY)
+    monkeypatch.setattr(Config, "GATE_SNAPSHOT_SECRET_KEY", SNAPSHOT_KEY)
+    monkeypatch.setattr(Config, "GATE_SNAPSHOT_SETTLE_SECONDS", 0)
+    app = create_app()
+    with app.app_context():
+        db.session.add_all([
+            Student(student_id="STU001", full_name="Owner", status="active"),
+            Student(student_id="STU002", full_name="Other", status="active"),
+        ])
+        db.session.flush()
+        asset = Asset(owner_student_id="STU001", serial_number="SN-1")
+        db.session.add(asset)
+        db.session.flush()
+        asset.qr_signature = generate_qr_signature(asset)
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+def _qr_data():
+    return db.session.execute(db.select(Asset.qr_signature)).scalar_one()
+
+def test_snapshot_key_must_be_set_and_separate_from_qr_key():
+    with pytest.raises(ValueError):
+        snapshot_key({"GATE_SNAPSHOT_SECRET_KEY": "", "QR_SECRET_KEY": QR_KEY})
+    with pytest.raises(ValueError):
+        snapshot_key({"GATE_SNAPSHOT_SECRET_KEY": QR_KEY, "QR_SECRET_KEY": QR_KEY})
+    assert snapshot_key({"GATE_SNAPSHOT_SECRET_KEY": SNAPSHOT_KEY, "QR_SECRET_KEY": QR_KEY}) == SNAPSHOT_KEY.encode()
+
+def test_signature_covers_every_field(app):
+    snapshot = build_snapshot(SNAPSHOT_KEY.encode())
+    assert verify_snapshot(snapshot, SNAPSHOT_KEY.encode())
+    assert not verify_snapshot(snapshot, QR_KEY.encode())
+    for field, value in (("seq", 999), ("students", [["STU999", "active"]]), ("qr_validity_seconds", 10 ** 9)):
+        tampered = copy.deepcopy(snapshot)
+        tampered[field] = value
+        assert not verify_snapshot(tampered, SNAPSHOT_KEY.encode())
+    unsigned = {key: value for key, value in snapshot.items() if key != "signature"}
+    assert not verify_snapshot(unsigned, SNAPSHOT_KEY.encode())
+
+def test_snapshot_holds_no_qr_payloads(app):
+    snapshot = build_snapshot(SNAPSHOT_KEY.encode())
+    assert _qr_data() not in str(snapshot)
+
+def test_node_rejects_tampered_or_foreign_snapshots(app):
+    node = GateSnapshot(SNAPSHOT_KEY.encode())
+    snapshot = build_snapshot(SNAPSHOT_KEY.encode())
+    tampered = copy.deepcopy(snapshot)
+    tampered["students"].append(["STU999", "active"])
+    with pytest.raises(SnapshotError):
+        node.load(tampered)
+    with pytest.raises(SnapshotError):
+        node.load(sign_snapshot(copy.deepcopy(snapshot), QR_KEY.encode()))
+    node.load(snapshot)
+    assert node.decide("STU999") == [(None, "BLOCKED", "Student invalid or inactive")]
+
+def test_node_decisions_match_the_gate(app):
+    node = GateSnapshot(SNAPSHOT_KEY.encode())
+    node.load(build_snapshot(SNAPSHOT_KEY.encode()))
+    qr_data = _qr_data()
+    assert node.decide("STU001", [qr_data])[0][1:] == ("ALLOWED", "Exit verified successfully")
+    assert node.decide("STU002", [qr_data])[0][1:] == ("BLOCKED", "Ownership mismatch")
+    assert node.decide("STU001") == [(None, "BLOCKED", "Registered assets present")]
+    assert node.decide("STU002") == [(None, "ALLOWED", "Exit without registered assets")]
+    assert node.decide("STU001", ["forged"]) == [(None, "BLOCKED", "Invalid QR")]
+
+def test_node_enforces_qr_expiry(app):
+    node = GateSnapshot(SNAPSHOT_KEY.encode())
+    node.load(build_snapshot(SNAPSHOT_KEY.encode()))
+    issued_at = next(iter(node.assets_by_hash.values()))[4]
+    expired = issued_at + node.qr_validity_seconds + 1
+    assert node.decide("STU001", [_qr_data()], now=expired) == [(None, "BLOCKED", "Invalid QR")]
+
+def test_delta_applies_only_on_top_of_its_base(app):
+    node = GateSnapshot(SNAPSHOT_KEY.encode())
+    full = build_snapshot(SNAPSHOT_KEY.encode())
+    node.load(full)
+    db.session.get(Student, "STU001").status = "blocked"
+    db.session.commit()
+    delta = build_snapshot(SNAPSHOT_KEY.encode(), since=full["seq"])
+    assert delta["students"] == [["STU001", "blocked"]]
+    with pytest.raises(SnapshotError):
+        GateSnapshot(SNAPSHOT_KEY.encode()).load(delta)
+    node.load(delta)
+    assert node.decide("STU001") == [(None, "BLOCKED", "Student invalid or inactive")]
+
+def test_recent_changes_are_held_back_from_seq(app):
+    app.config["GATE_SNAPSHOT_SETTLE_SECONDS"] = 60
+    settled = db.session.execute(db.select(db.func.max(GateChange.seq))).scalar()
+    db.session.execute(update(GateChange).values(changed_at=datetime.utcnow() - timedelta(minutes=5)))
+    db.session.commit()
+    assert settled_seq() == settled
+    db.session.get(Student, "STU002").full_name = "Renamed"
+    db.session.commit()
+    assert settled_seq() == settled
+    assert build_snapshot(SNAPSHOT_KEY.encode(), since=settled)["students"] == []
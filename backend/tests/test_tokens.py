@@ -0,0 +1,103 @@
+import base64
+import pytest
+from backend.app import create_app
+from backend.config import Config
+from backend.qr.compact import CompactQRCodec, COMPACT_MAX_LENGTH
+from backend.utils import crypto
+from backend.utils.tokens import TokenCodec
+
+KEY = b"k" * 32
+FIELDS = ["42", "STU001", "SN-42", "00ff00ff00ff00ff", "1700000000"]
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'tokens.db'}")
+    monkeypatch.setattr(Config, "ENFORCE_HTTPS", False)
+    app = create_app()
+    with app.app_context():
+        yield app
+
+def _flip(token, index):
+    """The token with one character swapped for another valid one"""
+    replacement = "A" if token[index] != "A" else "B"
+    return token[:index] + replacement + token[index + 1:]
+
+@pytest.mark.parametrize("fmt", ["pipe", "binary"])
+def test_round_trip(fmt):
+    codec = TokenCodec(KEY, field_count=5)
+    assert codec.decode(codec.encode(FIELDS, fmt=fmt)) == FIELDS
+
+def test_formats_are_not_parsed_as_each_other():
+    codec = TokenCodec(KEY, field_count=5)
+    pipe, binary = codec.encode(FIELDS, fmt="pipe"), codec.encode(FIELDS, fmt="binary")
+    assert codec.decode("~" + pipe.rstrip("=")) is None
+    assert codec.decode(binary[1:]) is None
+    assert codec.decode(binary[1:] + "=" * (-len(binary[1:]) % 4)) is None
+
+@pytest.mark.parametrize("fmt", ["pipe", "binary"])
+def test_tampered_token_is_rejected(fmt):
+    codec = TokenCodec(KEY, field_count=5)
+    token = codec.encode(FIELDS, fmt=fmt)
+    for index in (2, len(token) // 2, len(token) - 6):
+        assert codec.decode(_flip(token, index)) is None
+
+def test_edited_pipe_field_is_rejected():
+    codec = TokenCodec(KEY, field_count=5)
+    raw = base64.urlsafe_b64decode(codec.encode(FIELDS))
+    forged = base64.urlsafe_b64encode(raw.replace(b"STU001", b"STU002")).decode()
+    assert codec.decode(forged) is None
+
+@pytest.mark.parametrize("fmt", ["pipe", "binary"])
+def test_other_key_is_rejected(fmt):
+    token = TokenCodec(b"other-key", field_count=5).encode(FIELDS, fmt=fmt)
+    assert TokenCodec(KEY, field_count=5).decode(token) is None
+
+@pytest.mark.parametrize("fmt", ["pipe", "binary"])
+def test_wrong_field_count_is_rejected(fmt):
+    token = TokenCodec(KEY, field_count=4).encode(FIELDS[:4], fmt=fmt)
+    assert TokenCodec(KEY, field_count=5).decode(token) is None
+
+@pytest.mark.parametrize("token", [None, "", 42, "not base64!", "~", "~!!!", "a" * 513, "Zm9v"])
+def test_malformed_input_is_rejected(token):
+    assert TokenCodec(KEY, field_count=5).decode(token) is None
+
+def test_compact_round_trip():
+    codec = CompactQRCodec(KEY)
+    token = codec.encode(42, "STU001", b"\x01\x02\x03\x04", 1700000000)
+    assert token.startswith("Q1.")
+    assert token == token.upper()
+    assert codec.decode(token) == (42, "STU001", 1700000000)
+
+def test_compact_tampered_or_foreign_token_is_rejected():
+    token = CompactQRCodec(KEY).encode(42, "STU001", b"\x01\x02\x03\x04", 1700000000)
+    for index in (4, len(token) // 2, len(token) - 1):
+        assert CompactQRCodec(KEY).decode(_flip(token, index)) is None
+    assert CompactQRCodec(b"other-key").decode(token) is None
+
+@pytest.mark.parametrize("token", [None, "Q1.", "Q1.abc", "Q2.AAAA", "Q1.AAAAAAAAAAAAAAAAAAAA", "Q1." + "A" * COMPACT_MAX_LENGTH])
+def test_compact_malformed_input_is_rejected(token):
+    assert CompactQRCodec(KEY).decode(token) is None
+
+@pytest.mark.parametrize("fmt", ["pipe", "binary"])
+def test_exit_token_round_trip(app, fmt):
+    app.config["EXIT_TOKEN_FORMAT"] = fmt
+    token = crypto.generate_exit_token("STU001", "7", True)
+    assert crypto.verify_exit_token(token, "STU001", "7", require_has_assets=True)
+    assert crypto.verify_exit_token(token, "STU002", "7") is False
+    assert crypto.verify_exit_token(token, "STU001", "8") is False
+    assert crypto.verify_exit_token(token, "STU001", "7", require_has_assets=False) is False
+
+def test_exit_token_format_change_keeps_issued_tokens_valid(app):
+    app.config["EXIT_TOKEN_FORMAT"] = "pipe"
+    token = crypto.generate_exit_token("STU001", "7", False)
+    app.config["EXIT_TOKEN_FORMAT"] = "binary"
+    assert crypto.verify_exit_token(token, "STU001", "7")
+
+def test_expired_exit_token_is_rejected(app, monkeypatch):
+    token = crypto.generate_exit_token("STU001", "7", False)
+    issued = crypto.time.time()
+    ttl = app.config["EXIT_TOKEN_TTL_SECONDS"]
+    monkeypatch.setattr(crypto.time, "time", lambda: issued + ttl - 1)
+    assert crypto.verify_exit_token(token, "STU001", "7")
+    monkeypatch.setattr(crypto.time, "time", lambda: issued + ttl + 2)
+    assert crypto.verify_exit_token(token, "STU001", "7") is False
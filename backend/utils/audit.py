@@ -0,0 +1,244 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert, text
+from backend.app import db
+from backend.models.exit_log import ExitLog
+from backend.utils.metrics import count_exit_decisions, timed
+from backend.utils.stats import update_rollup
+
+logger = logging.getLogger(__name__)
+
+def write_exit_logs(rows):
+    """Insert exit log rows and their rollup counts in the current transaction"""
+    if rows:
+        db.session.execute(insert(ExitLog), rows)
+        update_rollup(rows)
+
+def _commit_keeping_loaded():
+    """Commit without expiring what the request already loaded.
+
+    Exit log rows go in through Core inserts and change none of the loaded
+    objects, so expiring them would only cost a refresh query per object
+    when the response serializes them.
+    """
+    session = db.session()
+    expire_on_commit, session.expire_on_commit = session.expire_on_commit, False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = expire_on_commit
+
+class ExitLogWriter:
+    """Write-behind buffer for ExitLog rows.
+
+    Gate requests enqueue plain row dicts; a daemon thread drains the queue
+    and bulk-inserts up to ``batch_size`` rows per transaction, at least every
+    ``flush_interval`` seconds. When the queue is full a caller waits up to
+    ``enqueue_timeout`` and then writes its rows synchronously, so audit
+    records are slowed down under pressure but never dropped.
+
+    A batch that fails is retried every ``flush_interval`` while the database
+    is unreachable. Once it has failed ``max_retries`` times against a
+    reachable database it is written row by row, and rows that still fail
+    are logged in full and dropped so one bad row cannot stall the writer.
+    """
+
+    def __init__(self, app, batch_size=200, flush_interval=0.5, queue_size=10000, enqueue_timeout=0.05,
+                 max_retries=3):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = []
+        self._failures = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.sync_fallbacks = 0
+
+    def _ensure_started(self):
+        # Worker threads do not survive a fork, so restart in each process
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="exit-log-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, rows):
+        self._ensure_started()
+        for index, row in enumerate(rows):
+            try:
+                self._queue.put(row, timeout=self.enqueue_timeout)
+            except queue.Full:
+                self.sync_fallbacks += 1
+                write_exit_logs(rows[index:])
+                _commit_keeping_loaded()
+                return
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        with self.app.app_context():
+            try:
+                with timed("exit_log_commit"):
+                    write_exit_logs(batch)
+                    db.session.commit()
+            except Exception:
+                logger.exception("Exit log flush of %d rows failed", len(batch))
+                db.session.rollback()
+                return False
+        self.flushed += len(batch)
+        for _ in batch:
+            self._queue.task_done()
+        return True
+
+    def _write_each(self, batch):
+        """Write rows one at a time, dropping the ones the database rejects"""
+        for row in batch:
+            if self._write([row]):
+                continue
+            self.dropped += 1
+            logger.error("Dropping exit log row that could not be written: %r", row)
+            self._queue.task_done()
+
+    def _database_available(self):
+        with self.app.app_context():
+            try:
+                db.session.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                return False
+            finally:
+                db.session.rollback()
+
+    def _run(self):
+        while True:
+            if not self._pending:
+                if self._stop.is_set():
+                    return
+                self._pending = self._take_batch()
+                if not self._pending:
+                    continue
+            if self._write(self._pending):
+                self._pending, self._failures = [], 0
+                continue
+            self._failures += 1
+            if self._failures >= self.max_retries and self._database_available():
+                # The database is up, so something in the batch is bad: isolate it
+                self._write_each(self._pending)
+                self._pending, self._failures = [], 0
+            elif self._stop.wait(self.flush_interval):
+                # Shutting down: drain() makes the final attempt
+                return
+
+    def flush(self):
+        """Block until every queued row has been written"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+        else:
+            self.drain()
+
+    def drain(self):
+        """Synchronously write whatever is still queued"""
+        batch, self._pending = self._pending, []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch and not self._write(batch):
+            self._write_each(batch)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 4)
+        self.drain()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "sync_fallbacks": self.sync_fallbacks
+        }
+
+def init_audit(app):
+    if app.config.get("EXIT_LOG_MODE", "sync") != "buffered":
+        return
+    writer = ExitLogWriter(
+        app,
+        batch_size=app.config["EXIT_LOG_BATCH_SIZE"],
+        flush_interval=app.config["EXIT_LOG_FLUSH_SECONDS"],
+        queue_size=app.config["EXIT_LOG_QUEUE_SIZE"],
+        enqueue_timeout=app.config["EXIT_LOG_ENQUEUE_TIMEOUT"],
+        max_retries=app.config["EXIT_LOG_MAX_RETRIES"]
+    )
+    app.extensions["exit_log_writer"] = writer
+    atexit.register(writer.stop)
+
+def record_exits(entries):
+    """Record exit decisions, either inline or through the write-behind buffer.
+
+    Each entry is a dict with ``student_id``, ``operator_id``, ``result``,
+    ``reason`` and optionally ``asset_id``. The timestamp is taken now so
+    buffered rows keep the time of the decision, not of the flush.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "timestamp": now,
+            "student_id": entry["student_id"],
+            "asset_id": entry.get("asset_id"),
+            "operator_id": entry["operator_id"],
+            "result": entry["result"],
+            "reason": entry.get("reason")
+        }
+        for entry in entries
+    ]
+    count_exit_decisions(rows)
+    writer = current_app.extensions.get("exit_log_writer")
+    if writer is not None:
+        writer.submit(rows)
+    else:
+        with timed("exit_log_commit"):
+            write_exit_logs(rows)
+            _commit_keeping_loaded()
+
+def record_exit(student_id, operator_id, result, reason, asset_id=None):
+    record_exits([{
+        "student_id": student_id,
+        "operator_id": operator_id,
+        "result": result,
+        "reason": reason,
+        "asset_id": asset_id
+    }])
@@ -0,0 +1,74 @@
+from functools import wraps
+from flask import jsonify
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
+from backend.app import db
+from backend.models.operator import Operator, DisabledOperator
+from backend.utils.cache import TTLCache
+from backend.utils.metrics import timed
+
+DISABLED_ROLE = "disabled"
+OPERATOR_ROLES = ("admin", "gate_operator")
+
+class OperatorDirectory:
+    """Decides whether a token's operator may still act, without a DB hit per request.
+
+    Roles come from the JWT claims. Operators disabled in this process are
+    rejected immediately via the revocation set; changes made by other
+    workers are picked up when the operator's cached role (refreshed at most
+    once per TTL) no longer matches the claim.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self._roles = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._revoked = set()
+
+    def configure(self, maxsize, ttl):
+        self._roles = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._revoked.clear()
+
+    def revoke(self, user_id):
+        self._revoked.add(str(user_id))
+        self._roles.pop(str(user_id))
+
+    def restore(self, user_id):
+        self._revoked.discard(str(user_id))
+        self._roles.pop(str(user_id))
+
+    def is_current(self, user_id, claimed_role):
+        user_id = str(user_id)
+        if user_id in self._revoked:
+            return False
+        role = self._roles.get(user_id)
+        if role is None:
+            row = db.session.execute(
+                db.select(Operator.role, DisabledOperator.user_id)
+                .outerjoin(DisabledOperator, DisabledOperator.user_id == Operator.user_id)
+                .where(Operator.user_id == int(user_id))
+            ).first()
+            role = row.role if row and row[1] is None else DISABLED_ROLE
+            self._roles.set(user_id, role)
+        return role == claimed_role and role != DISABLED_ROLE
+
+    def stats(self):
+        return dict(self._roles.stats(), revoked=len(self._revoked))
+
+operator_directory = OperatorDirectory()
+
+def role_required(*roles):
+    """Require a valid JWT whose ``role`` claim is one of ``roles``"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with timed("auth"):
+                verify_jwt_in_request()
+                role = get_jwt().get("role")
+                allowed = role in roles and operator_directory.is_current(get_jwt_identity(), role)
+            if not allowed:
+                message = "Admin access required" if roles == ("admin",) else "Operator access required"
+                return jsonify({"error": message}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+admin_required = role_required("admin")
+operator_required = role_required("admin", "gate_operator")
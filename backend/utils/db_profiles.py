@@ -0,0 +1,54 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+PROFILES = ("auto", "default", "sqlite", "postgres")
+
+def resolve_profile(config):
+    """Profile named by DB_PROFILE, or the one matching the database URL for "auto" """
+    profile = config.get("DB_PROFILE", "auto")
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE: {profile}")
+    if profile != "auto":
+        return profile
+    backend = make_url(config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+    return {"sqlite": "sqlite", "postgresql": "postgres"}.get(backend, "default")
+
+def engine_options(config):
+    """create_engine() keyword arguments for the configured profile"""
+    profile = resolve_profile(config)
+    if profile != "postgres":
+        return {}
+    options = {
+        "pool_size": config.get("DB_POOL_SIZE", 10),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 5),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 10),
+        "pool_recycle": config.get("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+        "pool_use_lifo": True
+    }
+    # Server-side prepared statements are a psycopg 3 feature; psycopg2 has no equivalent
+    if make_url(config["SQLALCHEMY_DATABASE_URI"]).get_driver_name() == "psycopg":
+        options["connect_args"] = {"prepare_threshold": config.get("PG_PREPARE_THRESHOLD", 5)}
+    return options
+
+def sqlite_pragmas(config):
+    return {
+        "journal_mode": "WAL",
+        "synchronous": config.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": config.get("SQLITE_BUSY_TIMEOUT_MS", 5000)
+    }
+
+def install_pragmas(engine, config):
+    """Run the profile's per-connection PRAGMAs on every new SQLite connection"""
+    if resolve_profile(config) != "sqlite" or engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
@@ -0,0 +1,115 @@
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.schema import CreateIndex
+from backend.app import db
+from backend.models.student import Student
+from backend.models.asset import Asset
+from backend.models.asset_summary import StudentAssetSummary
+from backend.models.exit_log import ExitLog
+from backend.models.exit_rollup import ExitRollup
+from backend.models.gate_change import GateChange
+
+def missing_indexes():
+    """Model-declared indexes absent from tables that already exist.
+
+    ``create_all`` only builds indexes together with new tables, so
+    databases created before an index was declared lack them.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing += [index for index in table.indexes if index.name not in present]
+    return missing
+
+def ensure_indexes():
+    """Create the missing indexes; returns their names.
+
+    Run it from the ``ensure-indexes`` command, not at startup: on
+    PostgreSQL the indexes are built ``CONCURRENTLY`` so writes carry on,
+    but a large table still takes a while.
+    """
+    engine = db.engine
+    concurrently = engine.dialect.name == "postgresql"
+    created = []
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for index in missing_indexes():
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+            if concurrently:
+                ddl = ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)
+            connection.execute(text(ddl))
+            created.append(index.name)
+    return created
+
+def hot_queries():
+    """``(name, statement)`` for each query shape on the gate and dashboard paths"""
+    now = datetime.utcnow()
+    since = now - timedelta(hours=24)
+    return [
+        ("student by id", select(Student).where(Student.student_id == "STU000001")),
+        ("asset summary by student", select(StudentAssetSummary).where(StudentAssetSummary.student_id == "STU000001")),
+        ("active assets of student", select(func.count()).select_from(Asset).where(
+            Asset.owner_student_id == "STU000001", Asset.status == "active")),
+        ("assets by id", select(Asset).where(Asset.asset_id.in_([1, 2, 3]))),
+        ("asset by serial", select(Asset.asset_id).where(Asset.serial_number == "SN-000001")),
+        ("active students", select(Student.student_id).where(Student.status == "active")),
+        ("log page", select(ExitLog).order_by(ExitLog.timestamp.desc(), ExitLog.log_id.desc()).limit(50)),
+        ("log page after cursor", select(ExitLog).where(ExitLog.timestamp < now)
+            .order_by(ExitLog.timestamp.desc(), ExitLog.log_id.desc()).limit(50)),
+        ("logs of student", select(ExitLog).where(ExitLog.student_id == "STU000001")
+            .order_by(ExitLog.timestamp.desc(), ExitLog.log_id.desc()).limit(50)),
+        ("logs of operator", select(ExitLog).where(ExitLog.operator_id == 1, ExitLog.timestamp >= since)),
+        ("logs of asset", select(ExitLog.log_id).where(ExitLog.asset_id == 1)),
+        ("blocked since", select(func.count()).select_from(ExitLog).where(
+            ExitLog.result == "BLOCKED", ExitLog.timestamp >= since)),
+        ("partial hour count", select(func.count(ExitLog.log_id)).where(
+            ExitLog.timestamp >= since, ExitLog.timestamp < since + timedelta(hours=1))),
+        ("rollup range", select(ExitRollup).where(ExitRollup.bucket_start >= since)),
+        ("rollup of operator", select(ExitRollup).where(
+            ExitRollup.operator_id == 1, ExitRollup.bucket_start >= since)),
+        ("gate changes after", select(GateChange).where(GateChange.seq > 100)),
+    ]
+
+def _sqlite_full_scans(sql):
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    # "SCAN t" reads the whole table; "SCAN t USING INDEX" walks an index in order
+    return [row[-1] for row in rows if row[-1].startswith("SCAN ") and " USING " not in row[-1]]
+
+def _postgres_full_scans(sql):
+    # With seq scans priced out, one still chosen means no index fits the query
+    db.session.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    scans = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node.get("Node Type") == "Seq Scan":
+            scans.append(f"Seq Scan on {node.get('Relation Name')}")
+        nodes.extend(node.get("Plans", []))
+    return scans
+
+def check_query_plans():
+    """EXPLAIN each hot query; returns ``{name: [full scans]}`` for the offenders"""
+    dialect = db.engine.dialect
+    if dialect.name == "sqlite":
+        full_scans = _sqlite_full_scans
+    elif dialect.name == "postgresql":
+        full_scans = _postgres_full_scans
+    else:
+        raise RuntimeError(f"Query plan checks are not implemented for {dialect.name}")
+    offenders = {}
+    try:
+        for name, statement in hot_queries():
+            sql = statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+            scans = full_scans(str(sql))
+            if scans:
+                offenders[name] = scans
+    finally:
+        db.session.rollback()
+    return offenders
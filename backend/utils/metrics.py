@@ -0,0 +1,206 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in values]
+        return lines
+
+class Histogram:
+    """Fixed-bucket histogram; an observation is one bisect and three additions"""
+
+    def __init__(self, name, help_text, buckets, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = label_names
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items())
+        names = self.label_names + ("le",)
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format.
+
+    Values are per process; with several workers each one is scraped (or
+    aggregated) separately. Collectors are called at scrape time for figures
+    that already live elsewhere, such as cache hit counters.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, label_names=()):
+        metric = Counter(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, buckets, label_names=()):
+        metric = Histogram(name, help_text, buckets, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """``collector()`` returns ``(name, type, help, label_names, [(labels, value)])`` tuples"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            for name, kind, help_text, label_names, samples in collector():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(label_names, labels)} {_number(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+request_seconds = metrics.histogram(
+    "eacs_request_duration_seconds", "Request latency by endpoint", LATENCY_BUCKETS, ("method", "endpoint")
+)
+requests_total = metrics.counter(
+    "eacs_requests_total", "Requests by endpoint and status", ("method", "endpoint", "status")
+)
+phase_seconds = metrics.histogram(
+    "eacs_phase_duration_seconds", "Time spent in hot-path phases", LATENCY_BUCKETS, ("phase",)
+)
+query_seconds = metrics.histogram(
+    "eacs_db_query_duration_seconds", "SQL statement execution time", QUERY_BUCKETS
+)
+request_queries = metrics.histogram(
+    "eacs_db_queries_per_request", "SQL statements issued per request", COUNT_BUCKETS, ("endpoint",)
+)
+request_query_seconds = metrics.histogram(
+    "eacs_db_time_per_request_seconds", "Total SQL time per request", LATENCY_BUCKETS, ("endpoint",)
+)
+exit_decisions = metrics.counter(
+    "eacs_exit_decisions_total", "Recorded exit decisions by result and reason", ("result", "reason")
+)
+
+@contextmanager
+def timed(phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase_seconds.observe(time.perf_counter() - started, (phase,))
+
+def count_exit_decisions(rows):
+    for row in rows:
+        exit_decisions.inc((row["result"], row.get("reason") or ""))
+
+def _endpoint():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    query_seconds.observe(elapsed)
+    if has_request_context():
+        g.metrics_queries = g.get("metrics_queries", 0) + 1
+        g.metrics_query_seconds = g.get("metrics_query_seconds", 0.0) + elapsed
+
+def _cache_collector():
+    from backend.qr.cache import qr_cache
+    from backend.utils.authz import operator_directory
+    from backend.utils.records import gate_records
+    caches = {"qr": qr_cache.stats(), "records": gate_records.stats(), "operators": operator_directory.stats()}
+    return [
+        ("eacs_cache_hits_total", "counter", "Cache hits", ("cache",),
+         [((name,), stats["hits"]) for name, stats in caches.items()]),
+        ("eacs_cache_misses_total", "counter", "Cache misses", ("cache",),
+         [((name,), stats["misses"]) for name, stats in caches.items()]),
+        ("eacs_cache_hit_ratio", "gauge", "Cache hit ratio since start", ("cache",),
+         [((name,), stats["hit_rate"]) for name, stats in caches.items()]),
+        ("eacs_cache_entries", "gauge", "Entries currently cached", ("cache",),
+         [((name,), stats["size"]) for name, stats in caches.items()]),
+    ]
+
+def init_metrics(app, engine):
+    """Hook request timing and SQL statement counting into the app"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    metrics.add_collector(_cache_collector)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def remember_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    # Recorded at teardown, which also runs for requests that raised
+    @app.teardown_request
+    def observe_request(exc):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        status = 500 if exc is not None else g.pop("metrics_status", 500)
+        endpoint = _endpoint()
+        request_seconds.observe(time.perf_counter() - started, (request.method, endpoint))
+        requests_total.inc((request.method, endpoint, str(status)))
+        request_queries.observe(g.pop("metrics_queries", 0), (endpoint,))
+        request_query_seconds.observe(g.pop("metrics_query_seconds", 0.0), (endpoint,))
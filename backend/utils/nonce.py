@@ -0,0 +1,73 @@
+import hashlib
+import math
+import threading
+import time
+from flask import current_app
+
+class LocalNonceStore:
+    """Single-use keys kept in memory, grouped into expiry buckets.
+
+    A key lives in the bucket covering its expiry time, so lookups touch at
+    most ``max_ttl / bucket_seconds`` sets and whole buckets are dropped at
+    once when they expire.
+    """
+
+    def __init__(self, bucket_seconds=30, clock=time.time):
+        self.bucket_seconds = bucket_seconds
+        self._clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def add_if_absent(self, key, ttl):
+        """Record ``key`` for ``ttl`` seconds; False if it was already recorded"""
+        now = self._clock()
+        current = math.floor(now / self.bucket_seconds)
+        expiry_bucket = math.ceil((now + ttl) / self.bucket_seconds)
+        with self._lock:
+            for index in [index for index in self._buckets if index <= current]:
+                del self._buckets[index]
+            if any(key in keys for keys in self._buckets.values()):
+                return False
+            self._buckets.setdefault(expiry_bucket, set()).add(key)
+            return True
+
+    def discard(self, key):
+        with self._lock:
+            for keys in self._buckets.values():
+                keys.discard(key)
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._buckets.values())
+
+class RedisNonceStore:
+    """Shared nonce store for multi-worker deployments (``SET NX EX``)"""
+
+    def __init__(self, url, prefix="nonce:"):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def add_if_absent(self, key, ttl):
+        return bool(self._client.set(self.prefix + key, b"1", nx=True, ex=max(1, int(math.ceil(ttl)))))
+
+    def discard(self, key):
+        self._client.delete(self.prefix + key)
+
+def init_nonce_store(app):
+    url = app.config.get("NONCE_STORE_URL")
+    if url:
+        store = RedisNonceStore(url)
+    else:
+        store = LocalNonceStore(bucket_seconds=app.config.get("NONCE_BUCKET_SECONDS", 30))
+    app.extensions["nonce_store"] = store
+
+def _nonce_key(parts):
+    return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+def claim_once(*parts, ttl):
+    """Claim a single-use key built from ``parts``; False on replay"""
+    return current_app.extensions["nonce_store"].add_if_absent(_nonce_key(parts), ttl)
+
+def release_claim(*parts):
+    """Give back a key claimed by ``claim_once`` whose request was rejected"""
+    current_app.extensions["nonce_store"].discard(_nonce_key(parts))
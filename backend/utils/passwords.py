@@ -0,0 +1,72 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is saturated or too slow to answer"""
+
+class PasswordHasher:
+    """Runs password hashing on a bounded process pool, off the request workers.
+
+    At most ``max_pending`` hash jobs are queued; further logins fail fast
+    with HashingBusy instead of piling up behind the pool. With
+    ``workers=0`` hashing runs inline (useful for tests and the CLI).
+    """
+
+    def __init__(self, method="pbkdf2:sha256", workers=2, max_pending=16, timeout=10.0):
+        self.configure(method, workers, max_pending, timeout)
+
+    def configure(self, method, workers, max_pending, timeout):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._current_params = None
+
+    @property
+    def current_params(self):
+        """Full parameter prefix new hashes get, e.g. ``pbkdf2:sha256:1000000``"""
+        if self._current_params is None:
+            self._current_params = generate_password_hash("", method=self.method).split("$", 1)[0]
+        return self._current_params
+
+    def _pool(self):
+        # A pool inherited over fork is unusable, so each process builds its own
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            return self._pool().submit(func, *args).result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingBusy()
+        finally:
+            self._slots.release()
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split("$", 1)[0] != self.current_params
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+password_hasher = PasswordHasher(workers=0)
@@ -0,0 +1,157 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*(?:\([^()]*\)\s*,?\s*)+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(statement):
+    """Reduce a statement to its shape: literals, parameters and list lengths dropped"""
+    shape = _STRING.sub("?", statement)
+    shape = _PARAMETER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    shape = _VALUES_LIST.sub("VALUES (...) ", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+def call_site():
+    """First frame inside the backend package that is not SQLAlchemy plumbing"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PACKAGE_ROOT) and filename != __file__:
+            return f"{os.path.relpath(filename, PACKAGE_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+class QueryRecorder:
+    """Collects ``(shape, seconds, call site)`` for each statement run on an engine.
+
+    With ``thread_id`` set, statements issued by other threads (other
+    requests, the exit log writer) are ignored.
+    """
+
+    def __init__(self, engine, thread_id=None):
+        self.engine = engine
+        self.thread_id = thread_id
+        self.statements = []
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._profiler_started = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if self.thread_id is not None and threading.get_ident() != self.thread_id:
+            return
+        elapsed = time.perf_counter() - context._profiler_started
+        self.statements.append((normalize_sql(statement), elapsed, call_site()))
+
+    def start(self):
+        event.listen(self.engine, "before_cursor_execute", self._before)
+        event.listen(self.engine, "after_cursor_execute", self._after)
+        return self
+
+    def stop(self):
+        event.remove(self.engine, "before_cursor_execute", self._before)
+        event.remove(self.engine, "after_cursor_execute", self._after)
+
+    def shapes(self):
+        return Counter(shape for shape, _, _ in self.statements)
+
+    def repeated(self, threshold):
+        """Shapes issued at least ``threshold`` times with the call sites that issued them"""
+        sites = {}
+        for shape, _, site in self.statements:
+            sites.setdefault(shape, Counter())[site] += 1
+        return {
+            shape: (count, sites[shape])
+            for shape, count in self.shapes().most_common()
+            if count >= threshold
+        }
+
+    def summary(self, limit=10):
+        return "\n".join(
+            f"  {count}x {shape}" for shape, count in self.shapes().most_common(limit)
+        )
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail with the grouped statement shapes if the block issues more than ``limit`` statements.
+
+    Only statements from the calling thread count; exit log rows handed to
+    the write-behind buffer are inserted on its thread, so budgets are
+    meant for the default synchronous mode. ``engine`` defaults to the
+    app's engine, so an app context is needed::
+
+        with app.app_context(), assert_max_queries(4):
+            client.post("/gate/exit/scan-student", json=payload, headers=headers)
+    """
+    if engine is None:
+        from backend.app import db
+        engine = db.engine
+    recorder = QueryRecorder(engine, thread_id=threading.get_ident()).start()
+    try:
+        yield recorder
+    finally:
+        recorder.stop()
+    if len(recorder.statements) > limit:
+        raise AssertionError(
+            f"{len(recorder.statements)} SQL statements issued, at most {limit} expected:\n{recorder.summary()}"
+        )
+
+def init_query_profiling(app, engine):
+    """Log slow statements and, with QUERY_PROFILING on, repeated shapes per request"""
+    slow_seconds = app.config.get("SLOW_QUERY_MS", 0) / 1000
+    profiling = app.config.get("QUERY_PROFILING", False)
+    repeat_threshold = app.config.get("QUERY_REPEAT_THRESHOLD", 3)
+    if not profiling and not slow_seconds:
+        return
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._profiler_started = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._profiler_started
+        site = None
+        if slow_seconds and elapsed >= slow_seconds:
+            site = call_site()
+            logger.warning("Slow query (%.1f ms) at %s: %s", elapsed * 1000, site, normalize_sql(statement))
+        if profiling and has_request_context():
+            g.setdefault("query_profile", []).append((normalize_sql(statement), elapsed, site or call_site()))
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    if not profiling:
+        return
+
+    @app.after_request
+    def report_query_profile(response):
+        statements = g.pop("query_profile", [])
+        response.headers["X-Query-Count"] = str(len(statements))
+        response.headers["X-Query-Time-Ms"] = f"{sum(elapsed for _, elapsed, _ in statements) * 1000:.2f}"
+        sites = {}
+        for shape, _, site in statements:
+            sites.setdefault(shape, Counter())[site] += 1
+        for shape, by_site in sites.items():
+            count = sum(by_site.values())
+            if count >= repeat_threshold:
+                logger.warning(
+                    "Possible N+1 on %s %s: %d x %s (from %s)",
+                    request.method, request.path, count, shape,
+                    ", ".join(f"{site} x{hits}" for site, hits in by_site.most_common(3))
+                )
+        return response
@@ -0,0 +1,44 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TokenBucketLimiter:
+    """Per-key token buckets held in memory, least recently used keys evicted first.
+
+    A refill rate of zero turns the limiter off rather than locking keys out for good.
+    """
+
+    def __init__(self, capacity, refill_per_second, maxsize=10000, clock=time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.configure(capacity, refill_per_second)
+
+    def configure(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        with self._lock:
+            self._buckets.clear()
+
+    def acquire(self, key):
+        """Take one token; returns ``(allowed, retry_after_seconds)``"""
+        if self.refill_per_second <= 0:
+            return True, 0
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return True, 0
+        return False, (1 - tokens) / self.refill_per_second
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
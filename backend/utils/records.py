@@ -0,0 +1,122 @@
+import json
+from datetime import datetime
+from sqlalchemy import DateTime
+from backend.app import db
+from backend.models.student import Student
+from backend.models.asset import Asset
+from backend.models.asset_summary import active_asset_count
+from backend.utils.cache import TTLCache, snapshot_row, attach_row
+
+class RedisRecordStore:
+    """Shared second tier for multi-worker deployments; values are JSON"""
+
+    def __init__(self, url, prefix="gate-record:"):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        values = self._client.mget([self.prefix + key for key in keys])
+        return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, entries, ttl):
+        pipeline = self._client.pipeline(transaction=False)
+        for key, value in entries.items():
+            pipeline.set(self.prefix + key, json.dumps(value, default=datetime.isoformat), ex=max(1, int(ttl)))
+        pipeline.execute()
+
+    def delete(self, keys):
+        if keys:
+            self._client.delete(*[self.prefix + key for key in keys])
+
+def _restore(model, columns):
+    """Undo the JSON round trip for DateTime columns"""
+    for column in model.__table__.columns:
+        value = columns.get(column.key)
+        if isinstance(column.type, DateTime) and isinstance(value, str):
+            columns[column.key] = datetime.fromisoformat(value)
+    return columns
+
+class GateRecordCache:
+    """Read-through cache of the Student and Asset rows the gate reads.
+
+    Rows are kept as column snapshots in a process-local LRU with a short
+    TTL, optionally backed by a shared store, and handed back as instances
+    attached to the current session. Admin writes, roster syncs and QR
+    rotations drop the keys they touch; anything else is visible once the
+    TTL runs out, which bounds how long a newly blocked student can pass.
+    """
+
+    def __init__(self, maxsize=4096, ttl=5):
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._shared = None
+
+    def configure(self, maxsize, ttl, url=None):
+        self._local.maxsize = maxsize
+        self._local.ttl = ttl
+        self._shared = RedisRecordStore(url) if url else None
+        self.clear()
+
+    def _lookup(self, keys):
+        found = {}
+        for key in keys:
+            value = self._local.get(key)
+            if value is not None:
+                found[key] = value
+        missing = [key for key in keys if key not in found]
+        if missing and self._shared is not None:
+            shared = self._shared.get_many(missing)
+            for key, value in shared.items():
+                self._local.set(key, value)
+            found.update(shared)
+        return found
+
+    def _store(self, entries):
+        for key, value in entries.items():
+            self._local.set(key, value)
+        if entries and self._shared is not None:
+            self._shared.set_many(entries, self._local.ttl)
+
+    def get_student(self, student_id):
+        """``(student, active_asset_count)``; the student is None if unknown"""
+        key = f"student:{student_id}"
+        entry = self._lookup([key]).get(key)
+        if entry is None:
+            student = db.session.get(Student, student_id)
+            if student is None:
+                return None, 0
+            entry = {"columns": snapshot_row(student), "active_assets": active_asset_count(student)}
+            self._store({key: entry})
+            return student, entry["active_assets"]
+        return attach_row(Student, _restore(Student, dict(entry["columns"]))), entry["active_assets"]
+
+    def get_assets(self, asset_ids):
+        """Map of asset ID to asset for the IDs that exist, one query for all misses"""
+        keys = {asset_id: f"asset:{asset_id}" for asset_id in asset_ids}
+        cached = self._lookup(list(keys.values()))
+        assets = {
+            asset_id: attach_row(Asset, _restore(Asset, dict(cached[key])))
+            for asset_id, key in keys.items() if key in cached
+        }
+        missing = [asset_id for asset_id in keys if asset_id not in assets]
+        if missing:
+            loaded = Asset.query.filter(Asset.asset_id.in_(missing)).all()
+            self._store({keys[asset.asset_id]: snapshot_row(asset) for asset in loaded})
+            assets.update((asset.asset_id, asset) for asset in loaded)
+        return assets
+
+    def invalidate(self, student_ids=(), asset_ids=()):
+        keys = [f"student:{student_id}" for student_id in student_ids]
+        keys += [f"asset:{asset_id}" for asset_id in asset_ids]
+        for key in keys:
+            self._local.pop(key)
+        if self._shared is not None:
+            self._shared.delete(keys)
+
+    def clear(self):
+        self._local.clear()
+
+    def stats(self):
+        return self._local.stats()
+
+gate_records = GateRecordCache()
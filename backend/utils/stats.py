@@ -0,0 +1,317 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import islice
+from sqlalchemy import func, case, select, update, insert
+from backend.app import db
+from backend.models.student import Student
+from backend.models.asset import Asset
+from backend.models.exit_log import ExitLog
+from backend.models.exit_rollup import ExitRollup
+from backend.jobs.log_retention import iter_archived_logs
+
+try:
+    import numpy as np
+except ImportError:  # optional; only speeds up ad-hoc minute series
+    np = None
+
+REASON_MAX_LENGTH = 200
+
+def hour_bucket(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+def _rollup_key(row):
+    return (
+        hour_bucket(row["timestamp"]),
+        int(row["operator_id"]),
+        row["result"],
+        (row.get("reason") or "")[:REASON_MAX_LENGTH]
+    )
+
+def _upsert_counts(counts):
+    params = [
+        {"bucket_start": bucket, "operator_id": operator_id, "result": result, "reason": reason, "count": count}
+        for (bucket, operator_id, result, reason), count in counts.items()
+    ]
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(ExitRollup)
+        statement = statement.on_conflict_do_update(
+            index_elements=["bucket_start", "operator_id", "result", "reason"],
+            set_={"count": ExitRollup.count + statement.excluded.count}
+        )
+        db.session.execute(statement, params)
+        return
+    for param in params:
+        updated = db.session.execute(
+            update(ExitRollup)
+            .where(
+                ExitRollup.bucket_start == param["bucket_start"],
+                ExitRollup.operator_id == param["operator_id"],
+                ExitRollup.result == param["result"],
+                ExitRollup.reason == param["reason"]
+            )
+            .values(count=ExitRollup.count + param["count"])
+        )
+        if updated.rowcount == 0:
+            db.session.execute(insert(ExitRollup), [param])
+
+def update_rollup(rows):
+    """Fold freshly written exit log rows into the hourly rollup.
+
+    Runs in the caller's transaction so the rollup never drifts from the log.
+    """
+    counts = Counter(_rollup_key(row) for row in rows)
+    if counts:
+        _upsert_counts(counts)
+
+def _archived_counts(archive_dir, chunk_size):
+    """Rollup counts of archived rows that are no longer in the live log.
+
+    An interrupted archive run can leave rows in both places; those are
+    counted from the live log only.
+    """
+    counts = Counter()
+    rows = iter_archived_logs(archive_dir)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return counts
+        live = set(db.session.execute(
+            select(ExitLog.log_id).where(ExitLog.log_id.in_([row["log_id"] for row in chunk]))
+        ).scalars())
+        for row in chunk:
+            if row["log_id"] not in live:
+                counts[_rollup_key(dict(row, timestamp=datetime.fromisoformat(row["timestamp"])))] += 1
+
+def rebuild_rollup(archive_dir=None, chunk_size=5000):
+    """Recompute the rollup from scratch by streaming the exit log.
+
+    Rows moved out by log retention are counted from ``archive_dir``, so
+    totals for archived months survive the rebuild.
+    """
+    columns = (ExitLog.timestamp, ExitLog.operator_id, ExitLog.result, ExitLog.reason)
+    statement = select(*columns).execution_options(stream_results=True, yield_per=chunk_size)
+    counts = _archived_counts(archive_dir, chunk_size) if archive_dir else Counter()
+    for row in db.session.execute(statement):
+        counts[_rollup_key(row._mapping)] += 1
+    db.session.execute(ExitRollup.__table__.delete())
+    if counts:
+        _upsert_counts(counts)
+    db.session.commit()
+    return sum(counts.values())
+
+def rollup_needs_backfill():
+    """True for databases that predate the rollup: exit log rows but no rollup rows.
+
+    Backfill with the ``rebuild-exit-rollup`` command; doing it at startup
+    would have every worker scan the exit log and race on the upserts.
+    """
+    if db.session.query(ExitRollup.bucket_start).first() is not None:
+        return False
+    return db.session.query(ExitLog.log_id).first() is not None
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def compute_statistics(now=None):
+    """All dashboard counters in a single round trip"""
+    now = now or datetime.utcnow()
+    since = now - timedelta(hours=24)
+    # Whole hours after the boundary come from the rollup, the partial hour from the log
+    first_full_hour = hour_bucket(since) + timedelta(hours=1)
+
+    def scalar(*columns, where=None):
+        statement = select(*columns)
+        if where is not None:
+            statement = statement.where(where)
+        return statement.scalar_subquery()
+
+    def rollup_sum(condition):
+        return func.coalesce(func.sum(case((condition, ExitRollup.count), else_=0)), 0)
+
+    row = db.session.execute(select(
+        scalar(func.count(Student.student_id)),
+        scalar(_count_if(Student.status == 'active')),
+        scalar(func.count(Asset.asset_id)),
+        scalar(_count_if(Asset.status == 'active')),
+        scalar(func.coalesce(func.sum(ExitRollup.count), 0)),
+        scalar(rollup_sum(ExitRollup.result == 'ALLOWED')),
+        scalar(rollup_sum(ExitRollup.result == 'BLOCKED')),
+        scalar(rollup_sum(ExitRollup.bucket_start >= first_full_hour)),
+        scalar(
+            func.count(ExitLog.log_id),
+            where=db.and_(ExitLog.timestamp >= since, ExitLog.timestamp < first_full_hour)
+        )
+    )).one()
+    total_students, active_students, total_assets, active_assets, total, allowed, blocked, recent, partial = row
+    return {
+        "total_students": total_students,
+        "active_students": active_students,
+        "total_assets": total_assets,
+        "active_assets": active_assets,
+        "total_exits": total,
+        "recent_exits_24h": recent + partial,
+        "allowed_exits": allowed,
+        "blocked_exits": blocked
+    }
+
+BUCKET_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+
+def _truncate(timestamp, bucket):
+    if bucket == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if bucket == "hour":
+        return hour_bucket(timestamp)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _series(counts, since, until, bucket):
+    """Dense series from ``{(bucket_start, result): count}``, zero-filled.
+
+    A first bucket that starts before ``since`` is labelled with ``since``,
+    since it only counts exits from then on.
+    """
+    step = timedelta(seconds=BUCKET_SECONDS[bucket])
+    series = []
+    current = _truncate(since, bucket)
+    while current < until:
+        allowed = counts.get((current, "ALLOWED"), 0)
+        blocked = counts.get((current, "BLOCKED"), 0)
+        total = allowed + blocked
+        series.append({
+            "bucket": max(current, since).isoformat(),
+            "allowed": allowed,
+            "blocked": blocked,
+            "total": total,
+            "block_rate": round(blocked / total, 4) if total else 0.0
+        })
+        current += step
+    return series
+
+def _split_range(since, until):
+    """Split ``[since, until)`` into whole rollup hours and the partial edges.
+
+    Returns ``((first_hour, end_hour) or None, [(start, end), ...])``: the
+    rollup answers the whole hours, the exit log the edge ranges, the same
+    way ``compute_statistics`` clips its 24 hour window.
+    """
+    first_full_hour = hour_bucket(since)
+    if first_full_hour < since:
+        first_full_hour += timedelta(hours=1)
+    end_full_hour = hour_bucket(until)
+    if first_full_hour >= end_full_hour:
+        return None, [(since, until)]
+    edges = [(start, end) for start, end in ((since, first_full_hour), (end_full_hour, until)) if start < end]
+    return (first_full_hour, end_full_hour), edges
+
+def _rollup_counts(since, until, bucket, operator_id=None):
+    full_hours, edges = _split_range(since, until)
+    counts = Counter()
+    if full_hours:
+        statement = (
+            select(ExitRollup.bucket_start, ExitRollup.result, func.sum(ExitRollup.count))
+            .where(ExitRollup.bucket_start >= full_hours[0], ExitRollup.bucket_start < full_hours[1])
+            .group_by(ExitRollup.bucket_start, ExitRollup.result)
+        )
+        if operator_id is not None:
+            statement = statement.where(ExitRollup.operator_id == operator_id)
+        for bucket_start, result, count in db.session.execute(statement):
+            counts[(_truncate(bucket_start, bucket), result)] += count
+    for start, end in edges:
+        statement = select(ExitLog.timestamp, ExitLog.result).where(
+            ExitLog.timestamp >= start, ExitLog.timestamp < end
+        )
+        if operator_id is not None:
+            statement = statement.where(ExitLog.operator_id == operator_id)
+        for timestamp, result in db.session.execute(statement):
+            counts[(_truncate(timestamp, bucket), result)] += 1
+    return counts
+
+def _minute_counts(since, until, operator_id=None):
+    """Ad-hoc minute buckets straight from the exit log"""
+    statement = select(ExitLog.timestamp, ExitLog.result).where(
+        ExitLog.timestamp >= since, ExitLog.timestamp < until
+    )
+    if operator_id is not None:
+        statement = statement.where(ExitLog.operator_id == operator_id)
+    rows = db.session.execute(statement).all()
+    if not rows:
+        return {}
+    if np is None:
+        return Counter((_truncate(timestamp, "minute"), result) for timestamp, result in rows)
+
+    epoch = datetime(1970, 1, 1)
+    minutes = np.fromiter(
+        ((timestamp - epoch) // timedelta(minutes=1) for timestamp, _ in rows),
+        dtype=np.int64, count=len(rows)
+    )
+    blocked = np.fromiter((result == "BLOCKED" for _, result in rows), dtype=np.int64, count=len(rows))
+    # Encode (minute, result) as one integer key and count them in a single pass
+    keys, counts = np.unique(minutes * 2 + blocked, return_counts=True)
+    return {
+        (epoch + timedelta(minutes=int(key // 2)), "BLOCKED" if key % 2 else "ALLOWED"): int(count)
+        for key, count in zip(keys, counts)
+    }
+
+def top_block_reasons(since, until, limit=5, operator_id=None):
+    """Most frequent block reasons per operator over a time range"""
+    full_hours, edges = _split_range(since, until)
+    counts = Counter()
+    if full_hours:
+        statement = (
+            select(ExitRollup.operator_id, ExitRollup.reason, func.sum(ExitRollup.count))
+            .where(
+                ExitRollup.result == "BLOCKED",
+                ExitRollup.bucket_start >= full_hours[0],
+                ExitRollup.bucket_start < full_hours[1]
+            )
+            .group_by(ExitRollup.operator_id, ExitRollup.reason)
+        )
+        if operator_id is not None:
+            statement = statement.where(ExitRollup.operator_id == operator_id)
+        for op_id, reason, count in db.session.execute(statement):
+            counts[(op_id, reason)] += count
+    for start, end in edges:
+        statement = (
+            select(ExitLog.operator_id, ExitLog.reason, func.count())
+            .where(ExitLog.result == "BLOCKED", ExitLog.timestamp >= start, ExitLog.timestamp < end)
+            .group_by(ExitLog.operator_id, ExitLog.reason)
+        )
+        if operator_id is not None:
+            statement = statement.where(ExitLog.operator_id == operator_id)
+        for op_id, reason, count in db.session.execute(statement):
+            counts[(op_id, (reason or "")[:REASON_MAX_LENGTH])] += count
+    reasons = {}
+    for (op_id, reason), count in sorted(counts.items(), key=lambda item: (item[0][0], -item[1])):
+        entries = reasons.setdefault(op_id, [])
+        if len(entries) < limit:
+            entries.append({"reason": reason, "count": count})
+    return reasons
+
+def compute_analytics(since, until, bucket="hour", operator_id=None, top_reasons=5):
+    """Bucketed traffic series, peak bucket and top block reasons.
+
+    Hour and day buckets are read from the rollup, with the partial hours at
+    either end of the range counted from the exit log; minute buckets are
+    aggregated ad hoc from the exit log and should only cover short ranges.
+    """
+    if bucket == "minute":
+        counts = _minute_counts(since, until, operator_id)
+    else:
+        counts = _rollup_counts(since, until, bucket, operator_id)
+    series = _series(counts, since, until, bucket)
+    peak = max(series, key=lambda point: point["total"], default=None)
+    return {
+        "bucket": bucket,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "series": series,
+        "peak": peak if peak and peak["total"] else None,
+        "top_block_reasons": [
+            {"operator_id": op_id, "reasons": entries}
+            for op_id, entries in top_block_reasons(since, until, top_reasons, operator_id).items()
+        ]
+    }
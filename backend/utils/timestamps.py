@@ -0,0 +1,11 @@
+from datetime import datetime, timezone
+
+def naive_utc(timestamp):
+    """Drop the offset of an aware datetime after converting it to UTC; naive values are taken as UTC"""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+def parse_utc(value):
+    """Parse an ISO timestamp into the naive UTC datetimes the exit log stores"""
+    return naive_utc(datetime.fromisoformat(value))
@@ -0,0 +1,113 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import re
+from flask import current_app
+from backend.qr.compact import CompactQRCodec
+
+_PIPE_TOKEN = re.compile(r"^[A-Za-z0-9_-]+={0,2}$")
+_BINARY_TOKEN = re.compile(r"^~[A-Za-z0-9_-]+$")
+_HEX_SIGNATURE = re.compile(rb"^[0-9a-f]{64}$")
+
+BINARY_PREFIX = "~"
+BINARY_VERSION = 1
+BINARY_TAG_BYTES = 16
+
+class TokenCodec:
+    """Signs and parses the HMAC-protected tokens used at the gate.
+
+    Two wire formats are understood:
+
+    * ``pipe``: base64url of ``field|field|...|<hex HMAC-SHA256>``, the
+      original format of exit tokens and QR payloads.
+    * ``binary``: ``~`` followed by unpadded base64url of a version byte,
+      length-prefixed fields and a truncated HMAC tag; roughly half the size.
+
+    The HMAC key object is built once and copied per use, and inputs are
+    rejected on length and shape before any decoding or hashing happens.
+    """
+
+    def __init__(self, secret_key, field_count, max_length=512):
+        self._mac = hmac.new(secret_key, digestmod=hashlib.sha256)
+        self.field_count = field_count
+        self.max_length = max_length
+
+    def _digest(self, message):
+        mac = self._mac.copy()
+        mac.update(message)
+        return mac.digest()
+
+    def encode(self, fields, fmt="pipe"):
+        fields = [str(field).encode() for field in fields]
+        if fmt == "binary":
+            body = bytes([BINARY_VERSION]) + b"".join(bytes([len(field)]) + field for field in fields)
+            tag = self._digest(body)[:BINARY_TAG_BYTES]
+            return BINARY_PREFIX + base64.urlsafe_b64encode(body + tag).rstrip(b"=").decode()
+        message = b"|".join(fields)
+        token = message + b"|" + self._digest(message).hex().encode()
+        return base64.urlsafe_b64encode(token).decode()
+
+    def decode(self, token):
+        """Verified fields as strings, or None for anything malformed or forged"""
+        if not isinstance(token, str) or not token or len(token) > self.max_length:
+            return None
+        if token.startswith(BINARY_PREFIX):
+            return self._decode_binary(token)
+        return self._decode_pipe(token)
+
+    def _decode_pipe(self, token):
+        if len(token) % 4 or not _PIPE_TOKEN.match(token):
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token)
+        except binascii.Error:
+            return None
+        message, separator, signature = raw.rpartition(b"|")
+        if not separator or not _HEX_SIGNATURE.match(signature):
+            return None
+        fields = message.split(b"|")
+        if len(fields) != self.field_count:
+            return None
+        if not hmac.compare_digest(signature, self._digest(message).hex().encode()):
+            return None
+        try:
+            return [field.decode() for field in fields]
+        except UnicodeDecodeError:
+            return None
+
+    def _decode_binary(self, token):
+        if not _BINARY_TOKEN.match(token):
+            return None
+        encoded = token[len(BINARY_PREFIX):]
+        try:
+            raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+        except binascii.Error:
+            return None
+        if len(raw) <= BINARY_TAG_BYTES or raw[0] != BINARY_VERSION:
+            return None
+        body, tag = raw[:-BINARY_TAG_BYTES], raw[-BINARY_TAG_BYTES:]
+        fields = []
+        offset = 1
+        while offset < len(body):
+            length = body[offset]
+            fields.append(body[offset + 1:offset + 1 + length])
+            offset += 1 + length
+        if offset != len(body) or len(fields) != self.field_count:
+            return None
+        if not hmac.compare_digest(tag, self._digest(body)[:BINARY_TAG_BYTES]):
+            return None
+        try:
+            return [field.decode() for field in fields]
+        except UnicodeDecodeError:
+            return None
+
+def init_token_codecs(app):
+    app.extensions["token_codecs"] = {
+        "exit": TokenCodec(app.config["EXIT_TOKEN_SECRET_KEY"].encode(), field_count=5, max_length=512),
+        "qr": TokenCodec(app.config["QR_SECRET_KEY"].encode(), field_count=5, max_length=1024),
+        "qr_compact": CompactQRCodec(app.config["QR_SECRET_KEY"].encode())
+    }
+
+def get_codec(name):
+    return current_app.extensions["token_codecs"][name]
@@ -15,6 +15,13 @@ CREATE TABLE operator (
     role VARCHAR(20) DEFAULT 'gate_operator'
 );
 
+-- Disabled operators (the operator keeps their role while disabled)
+CREATE TABLE disabled_operator (
+    user_id INTEGER PRIMARY KEY REFERENCES operator(user_id),
+    disabled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    disabled_by INTEGER REFERENCES operator(user_id)
+);
+
 -- Asset table
 CREATE TABLE asset (
     asset_id SERIAL PRIMARY KEY,
@@ -39,12 +46,49 @@ CREATE TABLE exit_log (
     reason TEXT
 );
 
+-- Hourly exit counts per operator, result and reason
+CREATE TABLE exit_rollup (
+    bucket_start TIMESTAMP NOT NULL,
+    operator_id INTEGER NOT NULL,
+    result VARCHAR(20) NOT NULL,
+    reason VARCHAR(200) NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, operator_id, result, reason)
+);
+
+-- Active asset count per student for gate checks
+CREATE TABLE student_asset_summary (
+    student_id VARCHAR(20) PRIMARY KEY REFERENCES student(student_id),
+    active_assets INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Change feed for delta gate snapshots
+CREATE TABLE gate_change (
+    seq SERIAL PRIMARY KEY,
+    kind VARCHAR(10) NOT NULL,
+    key VARCHAR(20) NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Last journal entry synced from each offline gate node
+CREATE TABLE gate_journal_cursor (
+    node_id VARCHAR(64) PRIMARY KEY,
+    last_seq INTEGER NOT NULL DEFAULT 0,
+    synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes for performance
-CREATE INDEX idx_exit_log_timestamp ON exit_log(timestamp DESC);
-CREATE INDEX idx_exit_log_student_id ON exit_log(student_id);
-CREATE INDEX idx_asset_owner ON asset(owner_student_id);
+-- (kept in sync with the Index declarations on the models)
+CREATE INDEX idx_exit_log_timestamp_id ON exit_log(timestamp, log_id);
+CREATE INDEX idx_exit_log_student_timestamp ON exit_log(student_id, timestamp);
+CREATE INDEX idx_exit_log_operator_timestamp ON exit_log(operator_id, timestamp);
+CREATE INDEX idx_exit_log_result_timestamp ON exit_log(result, timestamp);
+CREATE INDEX idx_exit_log_asset ON exit_log(asset_id);
+CREATE INDEX idx_asset_owner_status ON asset(owner_student_id, status);
 CREATE INDEX idx_asset_status ON asset(status);
 CREATE INDEX idx_student_status ON student(status);
+CREATE INDEX idx_exit_rollup_operator_bucket ON exit_rollup(operator_id, bucket_start);
 
 -- Insert sample data (optional)
 INSERT INTO student (student_id, full_name, status) VALUES
@@ -208,13 +208,26 @@ export const adminRegisterAsset = async (payload) => {
   return data
 }
 
+// Admin listings are paginated; follow next_after until the last page
+const fetchAllPages = async (path, key) => {
+  const items = []
+  let after = null
+  do {
+    const params = { per_page: 1000 }
+    if (after !== null) params.after = after
+    const { data } = await api.get(path, { params })
+    items.push(...data[key])
+    after = data.next_after
+  } while (after !== null && after !== undefined)
+  return items
+}
+
 export const adminAssets = async () => {
   if (useMock) {
     const db = loadDB()
     return delay(db.assets)
   }
-  const { data } = await api.get('/admin/assets')
-  return data.assets
+  return fetchAllPages('/admin/assets', 'assets')
 }
 
 export const adminStudents = async () => {
@@ -222,8 +235,7 @@ export const adminStudents = async () => {
     const db = loadDB()
     return delay(db.students)
   }
-  const { data } = await api.get('/admin/students')
-  return data.students
+  return fetchAllPages('/admin/students', 'students')
 }
 
 export const adminStatistics = async () => {